@@ -1,15 +1,18 @@
 from fastapi import FastAPI, HTTPException, Request, Path, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 import aiosqlite
 import sqlite3
 import json
 import os
-from langdetect import detect
-import requests
+from langdetect import detect, DetectorFactory
+from langdetect.detector_factory import PROFILES_DIRECTORY
+from langdetect.lang_detect_exception import LangDetectException
+import httpx
+import asyncio
 from typing import Optional
 from datetime import datetime
 import time
@@ -17,6 +20,20 @@ import traceback
 import logging
 import hashlib
 import ast
+import socket
+import re
+import random
+import unicodedata
+import zlib
+import gzip
+import html
+import sys
+import argparse
+import bisect
+import difflib
+from email.utils import parsedate_to_datetime, formatdate
+from contextlib import asynccontextmanager, contextmanager
+from collections import OrderedDict
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -73,21 +90,730 @@ def get_db_path():
 DB_PATH = get_db_path()
 logger.info(f"Using database path: {DB_PATH}")
 
+# OpenRouter client configuration
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+OPENROUTER_CONNECT_TIMEOUT = float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", "10"))
+OPENROUTER_READ_TIMEOUT = float(os.getenv("OPENROUTER_READ_TIMEOUT", "120"))
+OPENROUTER_MAX_RETRIES = 3
+OPENROUTER_INITIAL_RETRY_DELAY = 1
+OPENROUTER_MAX_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_CONNECTIONS", "20"))
+# Ask for response_format json_object (only for models on OpenRouter that support it)
+OPENROUTER_JSON_MODE = os.getenv("OPENROUTER_JSON_MODE", "false").lower() in ("1", "true", "yes")
+
+# Shared pooled HTTP client, created at startup and closed at shutdown
+http_client: Optional[httpx.AsyncClient] = None
+
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(OPENROUTER_READ_TIMEOUT, connect=OPENROUTER_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=OPENROUTER_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENROUTER_MAX_CONNECTIONS
+        )
+    )
+
+def get_http_client() -> httpx.AsyncClient:
+    # Lazily create the client when used outside the app lifespan (e.g. scripts)
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = create_http_client()
+    return http_client
+
+# Batch fact-check configuration
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+BATCH_MAX_CLAIMS = int(os.getenv("BATCH_MAX_CLAIMS", "10000"))
+BATCH_COMMIT_SIZE = int(os.getenv("BATCH_COMMIT_SIZE", "50"))
+BATCH_COMMIT_INTERVAL = float(os.getenv("BATCH_COMMIT_INTERVAL", "1.0"))
+
+# SQLite connection pool configuration
+DB_READER_CONNECTIONS = int(os.getenv("DB_READER_CONNECTIONS", "4"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "30"))
+
+# Cached fact-checks are served for this long before being re-fetched
+CACHE_TTL_SECONDS = 86400
+
+# Stale-while-revalidate: an expired answer is still served, marked "stale", for
+# up to this many seconds past CACHE_TTL_SECONDS while a background worker
+# refreshes it (0 re-fetches expired claims inline)
+STALE_WHILE_REVALIDATE_SECONDS = float(os.getenv("STALE_WHILE_REVALIDATE_SECONDS", str(30 * 86400)))
+REFRESH_CONCURRENCY = int(os.getenv("REFRESH_CONCURRENCY", "2"))
+REFRESH_QUEUE_SIZE = int(os.getenv("REFRESH_QUEUE_SIZE", "1000"))
+
+# Scheduled refresh of the most-viewed claims before they expire (off by default)
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "false").lower() in ("1", "true", "yes")
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", "3600"))
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", "50"))
+
+# How often buffered view counts are written to the cache table
+VIEW_FLUSH_INTERVAL = float(os.getenv("VIEW_FLUSH_INTERVAL", "30"))
+
+# In-process hot cache in front of SQLite (HOT_CACHE_MAX_BYTES=0 disables it)
+HOT_CACHE_MAX_BYTES = int(os.getenv("HOT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+HOT_CACHE_TTL = float(os.getenv("HOT_CACHE_TTL", "300"))
+CLAIM_CACHE_MAX_AGE = int(os.getenv("CLAIM_CACHE_MAX_AGE", "300"))
+
+# Single-flight configuration: how long a worker may hold the upstream lease
+# for a claim, and how often other workers poll for its result. The default
+# covers every get_ai_response attempt timing out plus the backoff between them,
+# and the owner renews the lease while its fetch runs
+PENDING_LEASE_SECONDS = float(os.getenv("PENDING_LEASE_SECONDS", str(
+    OPENROUTER_MAX_RETRIES * (OPENROUTER_CONNECT_TIMEOUT + OPENROUTER_READ_TIMEOUT)
+    + OPENROUTER_INITIAL_RETRY_DELAY * (2 ** (OPENROUTER_MAX_RETRIES - 1) - 1)
+    + 30
+)))
+PENDING_POLL_INTERVAL = float(os.getenv("PENDING_POLL_INTERVAL", "0.5"))
+
+# Near-duplicate claim matching (off by default)
+NEAR_DUPLICATE_ENABLED = os.getenv("NEAR_DUPLICATE_ENABLED", "false").lower() in ("1", "true", "yes")
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.85"))
+NEAR_DUPLICATE_INDEX_LIMIT = int(os.getenv("NEAR_DUPLICATE_INDEX_LIMIT", "100000"))
+
+# Full-text search over history (falls back to LIKE when FTS5 is unavailable)
+SEARCH_FTS_ENABLED = os.getenv("SEARCH_FTS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Seconds to reuse a filtered history count before recomputing it
+HISTORY_COUNT_TTL = float(os.getenv("HISTORY_COUNT_TTL", "30"))
+
+# Sitemap: public base URL for <loc> entries (defaults to each request's own host),
+# URLs per shard, and how often changes made by other workers are picked up
+SITE_URL = os.getenv("SITE_URL") or os.getenv("RENDER_EXTERNAL_URL")
+SITEMAP_SHARD_SIZE = int(os.getenv("SITEMAP_SHARD_SIZE", "50000"))
+SITEMAP_REBUILD_DELAY = float(os.getenv("SITEMAP_REBUILD_DELAY", "5"))
+SITEMAP_REFRESH_INTERVAL = float(os.getenv("SITEMAP_REFRESH_INTERVAL", "300"))
+# Stands in for the base URL in prebuilt sitemaps when SITE_URL is unset
+SITEMAP_PLACEHOLDER_URL = "https://sitemap-base-url.invalid"
+
+# Metrics, exposed at /metrics in the Prometheus text format. Values are kept
+# per worker process, and every series carries a `worker` label so scrapes
+# that land on different workers don't mix their counters.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Requests slower than this are sampled to log where they spend their time (0 disables)
+SLOW_REQUEST_PROFILE_SECONDS = float(os.getenv("SLOW_REQUEST_PROFILE_SECONDS", "0"))
+SLOW_REQUEST_SAMPLE_INTERVAL = float(os.getenv("SLOW_REQUEST_SAMPLE_INTERVAL", "0.01"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+metrics_registry = []
+
+def format_metric_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+class CounterMetric:
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+        metrics_registry.append(self)
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        if METRICS_ENABLED:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, self.labelnames, labels, value
+
+class HistogramMetric:
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self.values: dict[tuple, list] = {}
+        metrics_registry.append(self)
+
+    def observe(self, value: float, *labels: str):
+        if not METRICS_ENABLED:
+            return
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self):
+        bucket_labelnames = self.labelnames + ("le",)
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", bucket_labelnames, labels + (le,), cumulative
+            yield f"{self.name}_sum", self.labelnames, labels, total
+            yield f"{self.name}_count", self.labelnames, labels, cumulative
+
+class CallbackMetric:
+    # Reads existing counters (lookup_stats, hot_cache.stats, ...) at scrape time
+    def __init__(self, name: str, documentation: str, metric_type: str, labelnames: tuple, callback):
+        self.name = name
+        self.documentation = documentation
+        self.type = metric_type
+        self.labelnames = labelnames
+        self.callback = callback
+        metrics_registry.append(self)
+
+    def samples(self):
+        for labels, value in self.callback().items():
+            yield self.name, self.labelnames, labels, value
+
+def render_metrics(worker: str) -> str:
+    lines = []
+    for metric in metrics_registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, labelnames, labels, value in metric.samples():
+            label_text = format_metric_labels(labelnames + ("worker",), labels + (worker,))
+            lines.append(f"{name}{label_text} {float(value)!r}")
+    return "\n".join(lines) + "\n"
+
+request_latency = HistogramMetric(
+    "http_request_duration_seconds", "Time to serve a request, by route template and status",
+    ("method", "route", "status")
+)
+stage_latency = HistogramMetric(
+    "factcheck_stage_duration_seconds", "Time spent in each stage of a fact-check", ("stage",)
+)
+openrouter_requests = CounterMetric(
+    "openrouter_requests_total", "OpenRouter calls by outcome", ("outcome",)
+)
+openrouter_retries = CounterMetric(
+    "openrouter_retries_total", "OpenRouter calls reissued after a failed attempt", ("reason",)
+)
+parse_failures = CounterMetric(
+    "openrouter_parse_failures_total", "Model replies that could not be parsed", ("mode",)
+)
+db_pool_wait = HistogramMetric(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled SQLite connection", ("mode",)
+)
+
+def classify_upstream_error(e: Exception) -> str:
+    if isinstance(e, UpstreamRateLimited):
+        return "rate_limited"
+    if isinstance(e, httpx.HTTPStatusError):
+        return "http_error"
+    if isinstance(e, httpx.RequestError):
+        return "network_error"
+    return "invalid_response"
+
+def get_route_label(scope) -> str:
+    # Label by route template so /claim/{claim_id} is one series, not one per claim
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope.get("endpoint") is not None and scope.get("root_path"):
+        return scope["root_path"]
+    return "unmatched"
+
+def format_await_stack(coro) -> str:
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "ag_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is not None:
+            frames.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})")
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "ag_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return " -> ".join(frames[-6:])
+
+async def profile_slow_request(task: asyncio.Task, method: str, path: str):
+    # Once a request passes the threshold, sample which await it is parked on
+    # until it finishes, then log the most common stacks
+    samples: dict[str, int] = {}
+    try:
+        await asyncio.sleep(SLOW_REQUEST_PROFILE_SECONDS)
+        while True:
+            stack = format_await_stack(task.get_coro())
+            samples[stack] = samples.get(stack, 0) + 1
+            await asyncio.sleep(SLOW_REQUEST_SAMPLE_INTERVAL)
+    except asyncio.CancelledError:
+        if samples:
+            total = sum(samples.values())
+            top = sorted(samples.items(), key=lambda item: item[1], reverse=True)[:5]
+            logger.warning(
+                "Slow request %s %s (%d samples):\n%s", method, path, total,
+                "\n".join(f"  {count / total:6.1%}  {stack}" for stack, count in top)
+            )
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        profiler = None
+        if SLOW_REQUEST_PROFILE_SECONDS > 0:
+            profiler = asyncio.create_task(
+                profile_slow_request(asyncio.current_task(), scope["method"], scope["path"])
+            )
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_latency.observe(
+                time.perf_counter() - started, scope["method"], get_route_label(scope), str(status[0])
+            )
+            if profiler is not None:
+                profiler.cancel()
+
+app.add_middleware(MetricsMiddleware)
+
 # Models
 class Query(BaseModel):
     text: str
     language: Optional[str] = None
 
-class Response(BaseModel):
+class FactCheckResponse(BaseModel):
     answer: str
     sources: list[str]
     classification: str
     translated: bool = False
 
+# Claim normalization: variants that differ only in Unicode form, case,
+# whitespace, punctuation or Arabic diacritics/tatweel share one cache entry
+ARABIC_DIACRITICS = re.compile(
+    "[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06DC\u06DF-\u06E8\u06EA-\u06ED]"
+)
+ARABIC_TATWEEL = "\u0640"
+
+def normalize_claim(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text)
+    text = ARABIC_DIACRITICS.sub("", text).replace(ARABIC_TATWEEL, "")
+    text = text.casefold()
+    text = "".join(" " if unicodedata.category(ch).startswith("P") else ch for ch in text)
+    return " ".join(text.split())
+
+def fold_search_text(text: Optional[str]) -> Optional[str]:
+    # Lighter than normalize_claim so search snippets keep their case and punctuation
+    if text is None:
+        return None
+    text = unicodedata.normalize("NFKC", text)
+    return ARABIC_DIACRITICS.sub("", text).replace(ARABIC_TATWEEL, "")
+
+async def register_sql_functions(db):
+    # Used by the cache_fts triggers, so every connection that writes to cache needs it
+    await db.create_function("fts_fold", 1, fold_search_text, deterministic=True)
+
+# Make langdetect deterministic so the same claim always gets the same language
+DetectorFactory.seed = 0
+
+def detect_language(text: str) -> str:
+    try:
+        return detect(text)
+    except LangDetectException:
+        return "unknown"
+
+# Codes detect_language can return; client-supplied languages outside this set are ignored
+LANGUAGE_CODES = frozenset(os.listdir(PROFILES_DIRECTORY))
+
+def normalize_language(language) -> Optional[str]:
+    if not isinstance(language, str):
+        return None
+    language = language.strip().lower()
+    return language if language in LANGUAGE_CODES else None
+
+async def resolve_language(query_text: str, language: Optional[str] = None) -> str:
+    # The first detection loads langdetect's profiles (~0.5 s), so detect in a
+    # thread and before taking the writer rather than while holding it
+    return normalize_language(language) or await asyncio.to_thread(detect_language, query_text)
+
+CLASSIFICATIONS = ["Accurate", "Misleading", "False", "Debated"]
+
+def normalize_classification(classification) -> Optional[str]:
+    # Map model output like "false" or "Misleading." onto the canonical labels
+    if classification is None:
+        return None
+    label = str(classification).strip().strip(".").strip()
+    first_word = re.split(r"\W+", label, maxsplit=1)[0].casefold()
+    for canonical in CLASSIFICATIONS:
+        if label.casefold() == canonical.casefold() or first_word == canonical.casefold():
+            return canonical
+    return label
+
+def get_claim_key(normalized_query: str) -> str:
+    return hashlib.sha256(normalized_query.encode()).hexdigest()
+
+# Words that flip or scope a claim's meaning. Trigram similarity barely notices
+# them ("is allowed" vs "is not allowed" scores ~0.95), so near-duplicate
+# matches must agree on all of them.
+CLAIM_NEGATIONS = {
+    "not", "no", "never", "none", "nor", "neither", "nobody", "nothing", "nowhere", "without",
+    "cannot", "forbidden", "prohibited", "haram",
+    "لا", "لم", "لن", "ليس", "ليست", "ما", "غير", "بدون", "حرام",
+}
+CLAIM_QUANTIFIERS = {
+    "all", "every", "each", "some", "any", "only", "always", "most", "few", "many", "more", "less",
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "hundred", "thousand", "million", "first", "second", "third", "half",
+    "كل", "بعض", "فقط", "دائما", "واحد", "اثنان", "اثنين", "ثلاث", "أربع", "اربع", "خمس",
+}
+
+def claim_key_tokens(words: list[str]) -> set[str]:
+    tokens = set()
+    for i, word in enumerate(words):
+        if word in CLAIM_NEGATIONS or word in CLAIM_QUANTIFIERS or any(ch.isdigit() for ch in word):
+            tokens.add(word)
+        elif word == "t" and i > 0 and words[i - 1].endswith("n"):
+            # normalize_claim turns "isn't" / "can't" into "isn t" / "can t"
+            tokens.add("not")
+    return tokens
+
+def claims_match_wordwise(first: str, second: str) -> bool:
+    # Same negation/quantity tokens, and the same words in the same order apart
+    # from spelling variants (typos, not added, dropped or swapped words)
+    first_words, second_words = first.split(), second.split()
+    if claim_key_tokens(first_words) != claim_key_tokens(second_words):
+        return False
+    matcher = difflib.SequenceMatcher(None, first_words, second_words, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if tag != "replace" or i2 - i1 != j2 - j1:
+            return False
+        for word, other in zip(first_words[i1:i2], second_words[j1:j2]):
+            # A word that also appears on the other side was moved, not misspelled
+            if word in second_words or other in first_words:
+                return False
+            if difflib.SequenceMatcher(None, word, other).ratio() < 0.8:
+                return False
+    return True
+
+# Near-duplicate index: MinHash signatures over character trigrams, bucketed
+# with LSH bands so a lookup only compares against a handful of candidates
+class NearDuplicateIndex:
+    PRIME = (1 << 61) - 1
+
+    def __init__(self, threshold: float, num_perm: int = 64, bands: int = 16, ngram: int = 3):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ngram = ngram
+        rng = random.Random(1)
+        self.permutations = [
+            (rng.randrange(1, self.PRIME), rng.randrange(0, self.PRIME))
+            for _ in range(num_perm)
+        ]
+        self.buckets: dict[tuple, list[str]] = {}
+        self.entries: set[str] = set()
+
+    def shingles(self, text: str) -> set[str]:
+        if len(text) <= self.ngram:
+            return {text}
+        return {text[i:i + self.ngram] for i in range(len(text) - self.ngram + 1)}
+
+    def band_keys(self, shingles: set[str]) -> list[tuple]:
+        hashes = [zlib.crc32(shingle.encode()) for shingle in shingles]
+        signature = [min((a * x + b) % self.PRIME for x in hashes) for a, b in self.permutations]
+        return [
+            (band, hash(tuple(signature[band * self.rows:(band + 1) * self.rows])))
+            for band in range(self.bands)
+        ]
+
+    def add(self, normalized_query: str):
+        if not normalized_query or normalized_query in self.entries:
+            return
+        self.entries.add(normalized_query)
+        for key in self.band_keys(self.shingles(normalized_query)):
+            self.buckets.setdefault(key, []).append(normalized_query)
+
+    def find(self, normalized_query: str) -> Optional[str]:
+        shingles = self.shingles(normalized_query)
+        candidates = set()
+        for key in self.band_keys(shingles):
+            candidates.update(self.buckets.get(key, ()))
+
+        scored = []
+        for candidate in candidates:
+            candidate_shingles = self.shingles(candidate)
+            score = len(shingles & candidate_shingles) / len(shingles | candidate_shingles)
+            if score >= self.threshold:
+                scored.append((score, candidate))
+        for _, candidate in sorted(scored, reverse=True):
+            if claims_match_wordwise(normalized_query, candidate):
+                return candidate
+        return None
+
+near_duplicate_index = NearDuplicateIndex(NEAR_DUPLICATE_THRESHOLD) if NEAR_DUPLICATE_ENABLED else None
+lookup_stats = {"exact_hits": 0, "stale_hits": 0, "near_duplicate_hits": 0, "misses": 0}
+
+async def build_near_duplicate_index():
+    try:
+        async with db_pool.reader() as db:
+            async with db.execute(
+                "SELECT normalized_query FROM cache ORDER BY timestamp DESC LIMIT ?",
+                (NEAR_DUPLICATE_INDEX_LIMIT,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+        for count, row in enumerate(rows, start=1):
+            near_duplicate_index.add(row[0])
+            if count % 500 == 0:
+                # Yield to the event loop so startup indexing never stalls requests
+                await asyncio.sleep(0)
+        logger.info(f"Near-duplicate index built with {len(near_duplicate_index.entries)} claims")
+    except Exception as e:
+        logger.error(f"Near-duplicate index build error: {str(e)}")
+
+# Shared SQLite connections owned by the app lifespan: a single writer
+# (serialized with a lock) and a queue of read-only connections. WAL mode
+# lets readers proceed while the writer commits, and long-lived connections
+# keep their prepared statement cache warm between requests.
+class DatabasePool:
+    def __init__(self, path: str, readers: int):
+        self.path = path
+        self.reader_count = max(1, readers)
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._readers: Optional[asyncio.Queue] = None
+        self._reader_connections: list[aiosqlite.Connection] = []
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._open_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self, read_only: bool = False) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self.path, timeout=DB_BUSY_TIMEOUT, cached_statements=256)
+        await register_sql_functions(db)
+        await db.execute("PRAGMA journal_mode = WAL")
+        await db.execute("PRAGMA synchronous = NORMAL")
+        await db.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+        await db.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+        await db.execute("PRAGMA temp_store = MEMORY")
+        if read_only:
+            await db.execute("PRAGMA query_only = ON")
+        return db
+
+    async def open(self):
+        if self._open_lock is None:
+            self._open_lock = asyncio.Lock()
+        async with self._open_lock:
+            if self.is_open:
+                return
+            self._write_lock = asyncio.Lock()
+            self._readers = asyncio.Queue()
+            for _ in range(self.reader_count):
+                db = await self._connect(read_only=True)
+                self._reader_connections.append(db)
+                self._readers.put_nowait(db)
+            self._writer = await self._connect()
+            logger.info(f"Database pool opened with 1 writer and {self.reader_count} readers")
+
+    async def close(self):
+        for db in self._reader_connections:
+            await db.close()
+        self._reader_connections = []
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    @asynccontextmanager
+    async def reader(self):
+        if not self.is_open:
+            await self.open()
+        started = time.perf_counter()
+        db = await self._readers.get()
+        db_pool_wait.observe(time.perf_counter() - started, "reader")
+        try:
+            yield db
+        finally:
+            self._readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def writer(self):
+        if not self.is_open:
+            await self.open()
+        started = time.perf_counter()
+        async with self._write_lock:
+            db_pool_wait.observe(time.perf_counter() - started, "writer")
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+
+db_pool = DatabasePool(DB_PATH, DB_READER_CONNECTIONS)
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version
+async def migrate_add_normalized_query(db):
+    await db.execute("ALTER TABLE cache ADD COLUMN normalized_query TEXT")
+    async with db.execute("SELECT id, query FROM cache") as cursor:
+        rows = await cursor.fetchall()
+    await db.executemany(
+        "UPDATE cache SET normalized_query = ? WHERE id = ?",
+        [(normalize_claim(query or ""), claim_id) for claim_id, query in rows]
+    )
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_cache_normalized_query ON cache(normalized_query)")
+
+async def migrate_add_search_index(db):
+    # FTS5 rows share the rowid of their cache row; text is folded with fts_fold so
+    # Arabic diacritics and tatweel don't split or hide words from the tokenizer
+    try:
+        await db.execute("""
+            CREATE VIRTUAL TABLE cache_fts USING fts5(
+                query, answer, sources,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 unavailable, history search will use LIKE: {str(e)}")
+        return
+
+    fts_values = """
+        fts_fold({row}.query),
+        fts_fold(json_extract({row}.response, '$.answer')),
+        fts_fold((SELECT group_concat(value, '; ') FROM json_each({row}.response, '$.sources')))
+    """
+    await db.execute(f"""
+        CREATE TRIGGER cache_fts_insert AFTER INSERT ON cache BEGIN
+            INSERT INTO cache_fts (rowid, query, answer, sources)
+            VALUES (new.rowid, {fts_values.format(row="new")});
+        END
+    """)
+    await db.execute(f"""
+        CREATE TRIGGER cache_fts_update AFTER UPDATE OF query, response ON cache BEGIN
+            DELETE FROM cache_fts WHERE rowid = old.rowid;
+            INSERT INTO cache_fts (rowid, query, answer, sources)
+            VALUES (new.rowid, {fts_values.format(row="new")});
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER cache_fts_delete AFTER DELETE ON cache BEGIN
+            DELETE FROM cache_fts WHERE rowid = old.rowid;
+        END
+    """)
+    await db.execute(f"""
+        INSERT INTO cache_fts (rowid, query, answer, sources)
+        SELECT cache.rowid, {fts_values.format(row="cache")} FROM cache
+    """)
+
+async def migrate_add_history_pagination(db):
+    # Index for keyset pagination, plus a trigger-maintained row count so the
+    # unfiltered history listing never runs COUNT(*)
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_cache_timestamp_id ON cache(timestamp, id)")
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS cache_counts (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+    await db.execute(
+        "INSERT OR REPLACE INTO cache_counts (name, value) SELECT 'total', COUNT(*) FROM cache"
+    )
+    await db.execute("""
+        CREATE TRIGGER cache_counts_insert AFTER INSERT ON cache BEGIN
+            UPDATE cache_counts SET value = value + 1 WHERE name = 'total';
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER cache_counts_delete AFTER DELETE ON cache BEGIN
+            UPDATE cache_counts SET value = value - 1 WHERE name = 'total';
+        END
+    """)
+
+async def migrate_add_response_columns(db):
+    # Denormalized fields so listings and stats don't decode every response blob.
+    # language is filled in after startup by backfill_languages, since detection is slow.
+    for column in (
+        "classification TEXT",
+        "language TEXT",
+        "answer_length INTEGER",
+        "created_at REAL",
+        "updated_at REAL",
+    ):
+        await db.execute(f"ALTER TABLE cache ADD COLUMN {column}")
+
+    async with db.execute("SELECT id, response, timestamp FROM cache") as cursor:
+        rows = await cursor.fetchall()
+    updates = []
+    for claim_id, response, timestamp in rows:
+        try:
+            response_data = json.loads(response)
+        except (TypeError, ValueError):
+            response_data = {}
+        updates.append((
+            normalize_classification(response_data.get("classification")),
+            len(response_data.get("answer") or ""),
+            timestamp,
+            timestamp,
+            claim_id
+        ))
+    await db.executemany(
+        "UPDATE cache SET classification = ?, answer_length = ?, created_at = ?, updated_at = ? WHERE id = ?",
+        updates
+    )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_cache_classification ON cache(classification, timestamp, id)"
+    )
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_cache_language ON cache(language)")
+
+async def migrate_add_sitemap_index(db):
+    # Lets the sitemap find the shards touched since its last refresh without a full scan
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_cache_updated_at ON cache(updated_at)")
+
+async def migrate_add_views(db):
+    await db.execute("ALTER TABLE cache ADD COLUMN views INTEGER NOT NULL DEFAULT 0")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_cache_views ON cache(views)")
+
+MIGRATIONS = [
+    migrate_add_normalized_query,
+    migrate_add_search_index,
+    migrate_add_history_pagination,
+    migrate_add_response_columns,
+    migrate_add_sitemap_index,
+    migrate_add_views,
+]
+
+async def run_migrations(db):
+    for version, migration in enumerate(MIGRATIONS, start=1):
+        # BEGIN IMMEDIATE serializes workers that start at the same time
+        await db.execute("BEGIN IMMEDIATE")
+        async with db.execute("PRAGMA user_version") as cursor:
+            current_version = (await cursor.fetchone())[0]
+        if current_version >= version:
+            await db.rollback()
+            continue
+        logger.info(f"Applying migration {version}: {migration.__name__}")
+        await migration(db)
+        await db.execute(f"PRAGMA user_version = {version}")
+        await db.commit()
+
 # Initialize database
 async def init_db():
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with aiosqlite.connect(DB_PATH, timeout=60) as db:
+            await register_sql_functions(db)
+            await db.execute("PRAGMA journal_mode = WAL")
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS cache (
                     id TEXT PRIMARY KEY,
@@ -96,36 +822,96 @@ async def init_db():
                     timestamp REAL
                 )
             """)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS pending (
+                    id TEXT PRIMARY KEY,
+                    owner TEXT,
+                    expires_at REAL
+                )
+            """)
             await db.commit()
+            await run_migrations(db)
     except Exception as e:
         logger.error(f"Database initialization error: {str(e)}")
         raise
 
+async def backfill_languages(batch_size: int = 500):
+    try:
+        while True:
+            async with db_pool.reader() as db:
+                async with db.execute(
+                    "SELECT id, query FROM cache WHERE language IS NULL LIMIT ?",
+                    (batch_size,)
+                ) as cursor:
+                    rows = await cursor.fetchall()
+            if not rows:
+                return
+            languages = await asyncio.to_thread(
+                lambda: [(detect_language(query or ""), claim_id) for claim_id, query in rows]
+            )
+            async with db_pool.writer() as db:
+                await db.executemany(
+                    "UPDATE cache SET language = ? WHERE id = ? AND language IS NULL",
+                    languages
+                )
+                await db.commit()
+    except Exception as e:
+        logger.error(f"Language backfill error: {str(e)}")
+
+async def detect_search_index() -> bool:
+    if not SEARCH_FTS_ENABLED:
+        return False
+    async with db_pool.reader() as db:
+        async with db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cache_fts'"
+        ) as cursor:
+            return await cursor.fetchone() is not None
+
+search_index_available = False
+
+# Long-running background loops, cancelled on shutdown
+periodic_tasks: list[asyncio.Task] = []
+
 @app.on_event("startup")
 async def startup_event():
+    global http_client, search_index_available
     await init_db()
+    await db_pool.open()
+    search_index_available = await detect_search_index()
+    asyncio.create_task(backfill_languages())
+    http_client = create_http_client()
+    if near_duplicate_index is not None:
+        asyncio.create_task(build_near_duplicate_index())
+    sitemap_store.start()
+    refresh_queue.start()
+    periodic_tasks.append(asyncio.create_task(flush_views_periodically()))
+    if PREWARM_ENABLED:
+        periodic_tasks.append(asyncio.create_task(prewarm_popular_claims()))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    global http_client
+    await sitemap_store.stop()
+    await refresh_queue.stop()
+    for task in periodic_tasks:
+        task.cancel()
+    await asyncio.gather(*periodic_tasks, return_exceptions=True)
+    periodic_tasks.clear()
+    try:
+        await flush_views()
+    except Exception as e:
+        logger.error("Error flushing view counts: %s", str(e))
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+    await db_pool.close()
 
 # Helper function to get static file path
 def get_static_file(filename: str) -> str:
     return os.path.join(STATIC_DIR, filename)
 
 # Helper function to interact with OpenRouter API
-async def get_ai_response(query: str) -> dict:
-    MAX_RETRIES = 3
-    INITIAL_RETRY_DELAY = 1
-
-    OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-    if not OPENROUTER_API_KEY:
-        raise HTTPException(status_code=500, detail="OpenRouter API key not configured")
-
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "HTTP-Referer": os.getenv("RENDER_EXTERNAL_URL", "http://localhost:8000"),
-        "X-Title": "Islam Fact Checker",
-        "Content-Type": "application/json"
-    }
-
-    system_prompt = """You are a knowledgeable Islamic scholar and fact-checker. 
+SYSTEM_PROMPT = """You are a knowledgeable Islamic scholar and fact-checker. 
     Analyze the following claim about Islam, providing:
     1. Full context with relevant Quranic verses or hadiths
     2. Citations from classical scholars
@@ -138,52 +924,1144 @@ async def get_ai_response(query: str) -> dict:
         "classification": "one of: Accurate, Misleading, False, or Debated"
     }"""
 
+def build_openrouter_request(query: str, stream: bool = False) -> tuple[dict, dict]:
+    OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+    if not OPENROUTER_API_KEY:
+        raise HTTPException(status_code=500, detail="OpenRouter API key not configured")
+
+    headers = {
+        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "HTTP-Referer": os.getenv("RENDER_EXTERNAL_URL", "http://localhost:8000"),
+        "X-Title": "Islam Fact Checker",
+        "Content-Type": "application/json"
+    }
+
     prompt = f"Claim to analyze: {query}"
+    payload = {
+        "model": "deepseek/deepseek-r1-zero:free",
+        "messages": [
+            {"role": "user", "content": SYSTEM_PROMPT + "\n" + prompt}
+        ]
+    }
+    if OPENROUTER_JSON_MODE:
+        payload["response_format"] = {"type": "json_object"}
+    if stream:
+        payload["stream"] = True
+    return headers, payload
+
+# Tolerant parsing of the model's reply. It is asked for a JSON object but may
+# wrap it in \boxed{...} or a code fence, surround it with prose, write Python
+# literals instead of JSON, or stop mid-object when it runs out of tokens.
+# Objects are located by scanning for balanced braces (outside of strings),
+# decoded as JSON first and as Python literals second, and a truncated object
+# is closed off before decoding. Only a reply that can't be repaired fails.
+class ResponseParseError(ValueError):
+    pass
+
+OBJECT_START = re.compile(r"""\{\s*["']""")
+STRUCTURE_CHARS = re.compile(r"""[{}\[\]"'\\,]""")
+THINK_BLOCK = re.compile(r"<think>.*?</think>", re.DOTALL)
+LITERAL_FIXES = re.compile(
+    r"""("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|\b(true|false|null)\b|,(\s*[}\]])""",
+    re.DOTALL
+)
+PYTHON_CONSTANTS = {"true": "True", "false": "False", "null": "None"}
 
-    for attempt in range(MAX_RETRIES):
+parse_results = CounterMetric(
+    "openrouter_parse_results_total", "Model replies parsed, by the decoding that succeeded", ("method",)
+)
+
+def scan_object(text: str, start: int):
+    # Returns (end, open_closers, open_quote, last_comma) where end is the index
+    # just past the brace matching text[start], or None if the text ends first;
+    # last_comma is (index, open_closers) for the last comma seen outside strings
+    closers = []
+    quote = None
+    last_comma = None
+    position = start
+    while True:
+        match = STRUCTURE_CHARS.search(text, position)
+        if match is None:
+            return None, closers, quote, last_comma
+        index = match.start()
+        char = text[index]
+        position = index + 1
+        if quote is not None:
+            if char == "\\":
+                position = index + 2
+            elif char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if not closers or closers[-1] != char:
+                return None, [], None, None
+            closers.pop()
+            if not closers:
+                return position, [], None, None
+        elif char == ",":
+            last_comma = (index, list(closers))
+
+def fix_python_literal(match) -> str:
+    if match.group(1):
+        # literal_eval rejects raw newlines inside strings
+        return match.group(1).replace("\r", "\\r").replace("\n", "\\n")
+    if match.group(2):
+        return PYTHON_CONSTANTS[match.group(2)]
+    return match.group(3)
+
+def decode_object(candidate: str):
+    try:
+        return json.loads(candidate, strict=False), "json"
+    except ValueError:
+        pass
+    try:
+        # Python literals with JSON constants, trailing commas or raw newlines
+        return ast.literal_eval(LITERAL_FIXES.sub(fix_python_literal, candidate)), "python"
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return None, None
+
+def close_truncated(text: str, closers: list, quote: Optional[str]) -> str:
+    if quote is not None:
+        text = text[:-1] if text.endswith("\\") else text
+        text += quote
+    else:
+        text = text.rstrip().rstrip(",")
+    return text + "".join(reversed(closers))
+
+def coerce_response(parsed) -> Optional[dict]:
+    if not isinstance(parsed, dict):
+        return None
+    fields = {str(key).strip().casefold(): value for key, value in parsed.items()}
+    answer = fields.get("answer")
+    classification = fields.get("classification")
+    if not isinstance(answer, str) or not answer.strip() or not isinstance(classification, str):
+        return None
+    # An echoed prompt template ("one of: Accurate, ...") or a verdict cut off
+    # mid-word isn't a fact-check; the caller moves on to the next object
+    if normalize_classification(classification) not in CLASSIFICATIONS:
+        return None
+    sources = fields.get("sources") or []
+    if isinstance(sources, str):
+        sources = [sources]
+    elif isinstance(sources, (list, tuple, set)):
+        sources = [str(source) for source in sources if source is not None]
+    else:
+        sources = []
+    return {"answer": answer.strip(), "sources": sources, "classification": classification.strip()}
+
+def repair_truncated(text: str, start: int, closers: list, quote: Optional[str], last_comma) -> Optional[dict]:
+    # Close the object where it stops unless the cut fell inside a string, whose
+    # text (an answer cut mid-sentence, say) can't be trusted; otherwise, or if
+    # the cut fell inside a key or before a value, drop the partial member after
+    # the last comma instead
+    attempts = [close_truncated(text[start:], closers, quote)] if quote is None else []
+    if last_comma is not None:
+        index, comma_closers = last_comma
+        attempts.append(close_truncated(text[start:index], comma_closers, None))
+    for candidate in attempts:
+        response = coerce_response(decode_object(candidate)[0])
+        if response:
+            return response
+    return None
+
+def parse_ai_content(content: str) -> dict:
+    text = THINK_BLOCK.sub("", content or "")
+    truncated = None
+    for match in OBJECT_START.finditer(text):
+        start = match.start()
+        end, closers, quote, last_comma = scan_object(text, start)
+        if end is None:
+            if truncated is None and closers:
+                truncated = (start, closers, quote, last_comma)
+            continue
+        parsed, method = decode_object(text[start:end])
+        response = coerce_response(parsed)
+        if response:
+            parse_results.inc(method)
+            return response
+
+    if truncated is not None:
+        response = repair_truncated(text, *truncated)
+        if response:
+            parse_results.inc("repaired")
+            return response
+    raise ResponseParseError("Model reply does not contain a usable fact-check")
+
+# Shared upstream backoff: a 429 from OpenRouter pauses every caller in this
+# worker until its Retry-After has passed, instead of each retrying blindly
+upstream_backoff_until = 0.0
+
+class UpstreamRateLimited(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limited by OpenRouter, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def check_rate_limit(response: httpx.Response, default_delay: float):
+    global upstream_backoff_until
+    if response.status_code != 429:
+        return
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    if retry_after is None:
+        retry_after = default_delay
+    upstream_backoff_until = max(upstream_backoff_until, time.monotonic() + retry_after)
+    raise UpstreamRateLimited(retry_after)
+
+async def wait_for_upstream_backoff():
+    delay = upstream_backoff_until - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+async def get_ai_response(query: str) -> dict:
+    headers, payload = build_openrouter_request(query)
+
+    for attempt in range(OPENROUTER_MAX_RETRIES):
+        retry_delay = OPENROUTER_INITIAL_RETRY_DELAY * (2 ** attempt)
         try:
-            payload = {
-                "model": "deepseek/deepseek-r1-zero:free",
-                "messages": [
-                    {"role": "user", "content": system_prompt + "\n" + prompt}
-                ]
-            }
-            
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=payload
-            )
+            with stage_latency.time("rate_limit_wait"):
+                await wait_for_upstream_backoff()
+            with stage_latency.time("openrouter_request"):
+                response = await get_http_client().post(
+                    OPENROUTER_URL,
+                    headers=headers,
+                    json=payload
+                )
                 
+            check_rate_limit(response, retry_delay)
             response.raise_for_status()
             result = response.json()
             
             content = result['choices'][0]['message']['content']
-            logger.info("Response content: %s", content)
-                
-            if content.startswith('\\boxed{'):
-                content = content[6:].strip()
-            
-            content = content.replace('\n', '').replace('    ', '')
-            parsed = ast.literal_eval(content)
-            if not all(key in parsed for key in ['answer', 'sources', 'classification']):
-                raise ValueError("Missing required fields in response")
+            logger.debug("Response content: %s", content)
+            try:
+                with stage_latency.time("parse"):
+                    parsed = parse_ai_content(content)
+            except Exception:
+                parse_failures.inc("request")
+                raise
+            openrouter_requests.inc("ok")
             return parsed
                 
         except Exception as e:
             logger.error(f"Attempt {attempt + 1} failed: {str(e)}")
-            if attempt == MAX_RETRIES - 1:
+            outcome = classify_upstream_error(e)
+            openrouter_requests.inc(outcome)
+            if attempt == OPENROUTER_MAX_RETRIES - 1:
                 raise HTTPException(
                     status_code=503,
                     detail="Service temporarily unavailable. Please try again later."
                 )
-            retry_delay = INITIAL_RETRY_DELAY * (2 ** attempt)
-            time.sleep(retry_delay)
+            openrouter_retries.inc(outcome)
+            if isinstance(e, (UpstreamRateLimited, ResponseParseError)):
+                # A rate limit waits on the shared backoff instead, and an
+                # unusable reply has nothing to back off from
+                continue
+            with stage_latency.time("retry_backoff"):
+                await asyncio.sleep(retry_delay)
+
+async def stream_ai_response(query: str):
+    # Yields ("reasoning" | "content", text) deltas from OpenRouter's SSE stream
+    headers, payload = build_openrouter_request(query, stream=True)
+    await wait_for_upstream_backoff()
+    async with get_http_client().stream("POST", OPENROUTER_URL, headers=headers, json=payload) as response:
+        check_rate_limit(response, 1)
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            # Blank lines separate events; lines starting with ":" are keep-alive comments
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            if "error" in chunk:
+                raise ValueError(chunk["error"].get("message", "Upstream stream error"))
+            delta = (chunk.get("choices") or [{}])[0].get("delta") or {}
+            if delta.get("reasoning"):
+                yield "reasoning", delta["reasoning"]
+            if delta.get("content"):
+                yield "content", delta["content"]
+
+# Incremental parsing of a streamed reply: the answer text is decoded as it
+# arrives, and sources/classification are emitted once each value is complete
+class IncrementalResponseParser:
+    ANSWER_PATTERN = re.compile(r"""["']answer["']\s*:\s*(["'])""")
+    CLASSIFICATION_PATTERN = re.compile(r"""["']classification["']\s*:\s*["']([^"'\\]*)["']""")
+    SOURCES_PATTERN = re.compile(r"""["']sources["']\s*:\s*\[""")
+    ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "/": "/", "\\": "\\", '"': '"', "'": "'"}
+
+    def __init__(self):
+        self.buffer = ""
+        self.answer_quote = None
+        self.answer_position = None
+        self.answer_done = False
+        self.sources = None
+        self.classification = None
+
+    def feed(self, text: str) -> list[tuple[str, dict]]:
+        self.buffer += text
+        events = []
+
+        if self.answer_position is None:
+            match = self.ANSWER_PATTERN.search(self.buffer)
+            if match:
+                self.answer_quote = match.group(1)
+                self.answer_position = match.end()
+        if self.answer_position is not None and not self.answer_done:
+            delta = self._decode_answer()
+            if delta:
+                events.append(("answer", {"text": delta}))
+
+        if self.sources is None:
+            sources = self._parse_sources()
+            if sources is not None:
+                self.sources = sources
+                events.append(("sources", {"sources": sources}))
+
+        if self.classification is None:
+            match = self.CLASSIFICATION_PATTERN.search(self.buffer)
+            if match:
+                self.classification = match.group(1).strip()
+                events.append(("classification", {"classification": self.classification}))
+
+        return events
+
+    def _decode_answer(self) -> str:
+        decoded = []
+        position = self.answer_position
+        while position < len(self.buffer):
+            char = self.buffer[position]
+            if char == "\\":
+                if position + 1 >= len(self.buffer):
+                    break
+                escaped = self.buffer[position + 1]
+                if escaped == "u":
+                    code = self.buffer[position + 2:position + 6]
+                    if len(code) < 4:
+                        break
+                    try:
+                        decoded.append(chr(int(code, 16)))
+                    except ValueError:
+                        decoded.append(code)
+                    position += 6
+                    continue
+                decoded.append(self.ESCAPES.get(escaped, escaped))
+                position += 2
+                continue
+            if char == self.answer_quote:
+                self.answer_done = True
+                position += 1
+                break
+            decoded.append(char)
+            position += 1
+        self.answer_position = position
+        return "".join(decoded)
+
+    def _parse_sources(self) -> Optional[list]:
+        match = self.SOURCES_PATTERN.search(self.buffer)
+        if not match:
+            return None
+        # Find the closing bracket, skipping brackets inside quoted strings
+        quote = None
+        position = match.end()
+        while position < len(self.buffer):
+            char = self.buffer[position]
+            if quote:
+                if char == "\\":
+                    position += 1
+                elif char == quote:
+                    quote = None
+            elif char in "\"'":
+                quote = char
+            elif char == "]":
+                literal = self.buffer[match.end() - 1:position + 1]
+                for parse in (json.loads, ast.literal_eval):
+                    try:
+                        sources = parse(literal)
+                        return sources if isinstance(sources, list) else None
+                    except (ValueError, SyntaxError):
+                        continue
+                return None
+            position += 1
+        return None
+
+# Bounded LRU with per-entry TTL, sized by an estimate of each entry's bytes.
+# Claims are stored under both "id:<claim id>" and "q:<normalized query>".
+class HotCache:
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries: OrderedDict[str, tuple[object, int, float]] = OrderedDict()
+        self.bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key: str):
+        item = self.entries.get(key)
+        if item is None:
+            self.stats["misses"] += 1
+            return None
+        value, size, expires_at = item
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    def set(self, key: str, value, size: int):
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (value, size, time.monotonic() + self.ttl)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, key: str):
+        if key in self.entries:
+            self._remove(key)
+            self.stats["invalidations"] += 1
+
+    def _remove(self, key: str):
+        _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+hot_cache = HotCache(HOT_CACHE_MAX_BYTES, HOT_CACHE_TTL)
+
+def cache_claim_entry(
+    claim_id: str,
+    query: str,
+    normalized_query: Optional[str],
+    response_json: str,
+    timestamp: float
+) -> dict:
+    # The ETag changes whenever the row is rewritten, since every write bumps its timestamp
+    entry = {
+        "id": claim_id,
+        "query": query,
+        "response": json.loads(response_json),
+        "timestamp": timestamp,
+        "etag": '"' + hashlib.sha1(f"{claim_id}:{timestamp!r}".encode()).hexdigest()[:16] + '"'
+    }
+    if hot_cache.max_bytes > 0:
+        size = len(response_json) + len(query or "") * 2 + 256
+        hot_cache.set(f"id:{claim_id}", entry, size)
+        if normalized_query:
+            hot_cache.set(f"q:{normalized_query}", entry, size)
+    return entry
+
+def invalidate_claim_entry(claim_id: str, normalized_query: str):
+    # Called after the write commits, so a concurrent read can't re-cache the old row
+    hot_cache.invalidate(f"id:{claim_id}")
+    hot_cache.invalidate(f"q:{normalized_query}")
+
+# Single-flight coalescing of identical in-flight fact-checks.
+# Within a worker, concurrent misses for the same claim await one shared
+# future; across workers, a lease row in the `pending` table elects a single
+# worker to call OpenRouter while the others poll the cache for its result.
+inflight_requests: dict[str, asyncio.Future] = {}
+singleflight_stats = {
+    "upstream_calls": 0,
+    "coalesced_local": 0,
+    "coalesced_remote": 0,
+    "lease_takeovers": 0,
+}
+
+def get_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+async def acquire_pending_lease(claim_key: str) -> bool:
+    now = time.time()
+    async with db_pool.writer() as db:
+        cursor = await db.execute(
+            """
+            INSERT INTO pending (id, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE pending.expires_at < ?
+            """,
+            (claim_key, get_worker_id(), now + PENDING_LEASE_SECONDS, now)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+async def renew_pending_lease(claim_key: str):
+    now = time.time()
+    async with db_pool.writer() as db:
+        await db.execute(
+            "UPDATE pending SET expires_at = ? WHERE id = ? AND owner = ?",
+            (now + PENDING_LEASE_SECONDS, claim_key, get_worker_id())
+        )
+        await db.commit()
+
+@asynccontextmanager
+async def renewing_lease(claim_key: str):
+    # Keeps extending a held lease while the upstream call runs, since rate-limit
+    # waits and slow streams can outlast any fixed lease
+    async def renew():
+        while True:
+            await asyncio.sleep(PENDING_LEASE_SECONDS / 3)
+            try:
+                await renew_pending_lease(claim_key)
+            except Exception as e:
+                logger.error(f"Error renewing lease: {str(e)}")
+
+    task = asyncio.create_task(renew())
+    try:
+        yield
+    finally:
+        task.cancel()
+
+async def release_pending_lease(claim_key: str):
+    async with db_pool.writer() as db:
+        await db.execute(
+            "DELETE FROM pending WHERE id = ? AND owner = ?",
+            (claim_key, get_worker_id())
+        )
+        await db.commit()
+
+async def get_cached_entry(normalized_query: str, use_hot_cache: bool = True) -> Optional[dict]:
+    entry = hot_cache.get(f"q:{normalized_query}") if use_hot_cache else None
+    if entry is None:
+        async with db_pool.reader() as db:
+            async with db.execute(
+                "SELECT id, query, response, timestamp FROM cache WHERE normalized_query = ? ORDER BY timestamp DESC LIMIT 1",
+                (normalized_query,)
+            ) as cursor:
+                result = await cursor.fetchone()
+        if not result:
+            return None
+        entry = cache_claim_entry(result[0], result[1], normalized_query, result[2], result[3])
+    return entry
+
+def entry_response(entry: dict, stale: bool = False) -> dict:
+    cached_response = dict(entry["response"])
+    cached_response['id'] = entry["id"]
+    if stale:
+        cached_response['stale'] = True
+    return cached_response
+
+async def get_fresh_cached_response(normalized_query: str) -> Optional[dict]:
+    entry = await get_cached_entry(normalized_query)
+    if entry is not None and (time.time() - entry["timestamp"]) < CACHE_TTL_SECONDS:
+        return entry_response(entry)
+    return None
+
+async def get_stored_response(normalized_query: str, max_age: float = CACHE_TTL_SECONDS) -> Optional[dict]:
+    # Reads SQLite rather than the hot cache, which may still hold the row
+    # another worker has just replaced; the hot cache is refreshed from it
+    entry = await get_cached_entry(normalized_query, use_hot_cache=False)
+    if entry is not None and (time.time() - entry["timestamp"]) < max_age:
+        return entry_response(entry)
+    return None
+
+async def is_lease_held(claim_key: str) -> bool:
+    async with db_pool.reader() as db:
+        async with db.execute(
+            "SELECT 1 FROM pending WHERE id = ? AND expires_at >= ?",
+            (claim_key, time.time())
+        ) as cursor:
+            return await cursor.fetchone() is not None
+
+async def store_cached_response(
+    db,
+    query_text: str,
+    normalized_query: str,
+    response: dict,
+    language: Optional[str] = None
+) -> str:
+    now = time.time()
+    classification = normalize_classification(response.get("classification"))
+    answer_length = len(response.get("answer") or "")
+
+    # Refresh the existing entry for this claim in place so its id (and any shared link) is kept
+    async with db.execute(
+        "SELECT id FROM cache WHERE normalized_query = ? ORDER BY timestamp DESC LIMIT 1",
+        (normalized_query,)
+    ) as cursor:
+        existing = await cursor.fetchone()
+    if existing:
+        await db.execute(
+            """
+            UPDATE cache SET response = ?, timestamp = ?, classification = ?, answer_length = ?, updated_at = ?
+            WHERE id = ?
+            """,
+            (json.dumps(response), now, classification, answer_length, now, existing[0])
+        )
+        sitemap_store.mark_dirty()
+        return existing[0]
+
+    # Claim ids are 8 hex characters, so rehash on the rare collision with another claim
+    claim_key = get_claim_key(normalized_query)
+    for attempt in range(16):
+        claim_id = claim_key[:8] if attempt == 0 else get_claim_key(f"{normalized_query}#{attempt}")[:8]
+        async with db.execute("SELECT 1 FROM cache WHERE id = ?", (claim_id,)) as cursor:
+            if await cursor.fetchone() is None:
+                break
+    else:
+        raise RuntimeError("Could not allocate a claim id")
+
+    await db.execute(
+        """
+        INSERT INTO cache (
+            id, query, normalized_query, response, timestamp,
+            classification, language, answer_length, created_at, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            claim_id, query_text, normalized_query, json.dumps(response), now,
+            classification, language, answer_length, now, now
+        )
+    )
+    if near_duplicate_index is not None:
+        near_duplicate_index.add(normalized_query)
+    sitemap_store.mark_dirty()
+    return claim_id
+
+async def fetch_and_store(
+    claim_key: str,
+    query_text: str,
+    normalized_query: str,
+    language: Optional[str] = None,
+    max_age: float = CACHE_TTL_SECONDS
+) -> dict:
+    # A stored row younger than max_age satisfies the request, so a claim
+    # written by another worker since our cache lookup isn't fetched again
+    while True:
+        if await acquire_pending_lease(claim_key):
+            try:
+                cached_response = await get_stored_response(normalized_query, max_age)
+                if cached_response:
+                    await release_pending_lease(claim_key)
+                    return cached_response
+                singleflight_stats["upstream_calls"] += 1
+                async with renewing_lease(claim_key):
+                    response = await get_ai_response(query_text)
+                language = await resolve_language(query_text, language)
+                with stage_latency.time("store"):
+                    async with db_pool.writer() as db:
+                        claim_id = await store_cached_response(db, query_text, normalized_query, response, language)
+                        await db.execute(
+                            "DELETE FROM pending WHERE id = ? AND owner = ?",
+                            (claim_key, get_worker_id())
+                        )
+                        await db.commit()
+                invalidate_claim_entry(claim_id, normalized_query)
+                response['id'] = claim_id
+                return response
+            except BaseException:
+                await release_pending_lease(claim_key)
+                raise
+
+        # Another worker holds the lease: wait for its result to land in the cache
+        singleflight_stats["coalesced_remote"] += 1
+        while await is_lease_held(claim_key):
+            await asyncio.sleep(PENDING_POLL_INTERVAL)
+            cached_response = await get_stored_response(normalized_query, max_age)
+            if cached_response:
+                return cached_response
+
+        cached_response = await get_stored_response(normalized_query, max_age)
+        if cached_response:
+            return cached_response
+        # The lease expired or its owner failed without a result; try to take over
+        singleflight_stats["lease_takeovers"] += 1
+
+async def get_ai_response_singleflight(
+    query_text: str,
+    normalized_query: str,
+    language: Optional[str] = None,
+    max_age: float = CACHE_TTL_SECONDS
+) -> dict:
+    claim_key = get_claim_key(normalized_query)
+    future = inflight_requests.get(claim_key)
+    if future is not None:
+        singleflight_stats["coalesced_local"] += 1
+        return dict(await asyncio.shield(future))
+
+    future = asyncio.get_running_loop().create_future()
+    inflight_requests[claim_key] = future
+    try:
+        response = await fetch_and_store(claim_key, query_text, normalized_query, language, max_age)
+        future.set_result(response)
+        return dict(response)
+    except BaseException as e:
+        future.set_exception(e)
+        # Mark the exception as retrieved when there are no other waiters
+        future.exception()
+        raise
+    finally:
+        inflight_requests.pop(claim_key, None)
+
+async def lookup_cached_response(normalized_query: str) -> Optional[dict]:
+    entry = await get_cached_entry(normalized_query)
+    age = time.time() - entry["timestamp"] if entry is not None else None
+    if age is not None and age < CACHE_TTL_SECONDS:
+        lookup_stats["exact_hits"] += 1
+        record_view(entry["id"])
+        return entry_response(entry)
+
+    # An expired answer for this exact claim beats a fresh one for a similar claim
+    if age is not None and age < CACHE_TTL_SECONDS + STALE_WHILE_REVALIDATE_SECONDS:
+        lookup_stats["stale_hits"] += 1
+        record_view(entry["id"])
+        refresh_queue.enqueue(entry["query"], normalized_query)
+        return entry_response(entry, stale=True)
+
+    if near_duplicate_index is not None:
+        match = near_duplicate_index.find(normalized_query)
+        if match and match != normalized_query:
+            cached_response = await get_fresh_cached_response(match)
+            if cached_response:
+                lookup_stats["near_duplicate_hits"] += 1
+                record_view(cached_response["id"])
+                return cached_response
+
+    lookup_stats["misses"] += 1
+    return None
+
+# Stale-while-revalidate: expired claims are refreshed by a small pool of
+# background workers. Each claim is queued at most once at a time, and the
+# refresh goes through get_ai_response_singleflight so it also coalesces with
+# foreground requests and with refreshes started by other workers.
+class RefreshQueue:
+    def __init__(self, concurrency: int, max_size: int):
+        self.concurrency = max(1, concurrency)
+        self.max_size = max_size
+        self.pending: set[str] = set()
+        self.stats = {"queued": 0, "refreshed": 0, "skipped": 0, "failed": 0, "dropped": 0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+
+    def start(self):
+        self._queue = asyncio.Queue(self.max_size)
+        self._workers = [asyncio.create_task(self.run()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def enqueue(self, query_text: str, normalized_query: str, refresh_after: float = CACHE_TTL_SECONDS) -> bool:
+        # refresh_after is the age at which the claim still needs refreshing when
+        # the job runs, so a claim refreshed meanwhile (here or by another worker) is skipped
+        if self._queue is None or normalized_query in self.pending:
+            return False
+        try:
+            self._queue.put_nowait((query_text, normalized_query, refresh_after))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            return False
+        self.pending.add(normalized_query)
+        self.stats["queued"] += 1
+        return True
+
+    async def run(self):
+        while True:
+            query_text, normalized_query, refresh_after = await self._queue.get()
+            try:
+                age = await get_claim_age(normalized_query)
+                if age is not None and age < refresh_after:
+                    # Drop our copy of the row so this worker stops serving the old answer
+                    hot_cache.invalidate(f"q:{normalized_query}")
+                    self.stats["skipped"] += 1
+                    continue
+                await get_ai_response_singleflight(query_text, normalized_query, max_age=refresh_after)
+                self.stats["refreshed"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error("Error refreshing claim %r: %s", query_text, str(e))
+            finally:
+                self.pending.discard(normalized_query)
+                self._queue.task_done()
+
+refresh_queue = RefreshQueue(REFRESH_CONCURRENCY, REFRESH_QUEUE_SIZE)
+
+async def get_claim_age(normalized_query: str) -> Optional[float]:
+    # Read from SQLite rather than the hot cache, which may hold a row another worker has replaced
+    async with db_pool.reader() as db:
+        async with db.execute(
+            "SELECT timestamp FROM cache WHERE normalized_query = ? ORDER BY timestamp DESC LIMIT 1",
+            (normalized_query,)
+        ) as cursor:
+            result = await cursor.fetchone()
+    return time.time() - result[0] if result else None
+
+async def prewarm_popular_claims():
+    # Refresh the most-viewed claims that would otherwise expire before the next run
+    while True:
+        try:
+            refresh_after = CACHE_TTL_SECONDS - PREWARM_INTERVAL * 1.5
+            async with db_pool.reader() as db:
+                async with db.execute(
+                    """
+                    SELECT query, normalized_query FROM (
+                        SELECT query, normalized_query, timestamp FROM cache
+                        WHERE views > 0 ORDER BY views DESC LIMIT ?
+                    ) WHERE timestamp <= ?
+                    """,
+                    (PREWARM_TOP_N, time.time() - refresh_after)
+                ) as cursor:
+                    rows = await cursor.fetchall()
+            for query_text, normalized_query in rows:
+                refresh_queue.enqueue(query_text, normalized_query or normalize_claim(query_text or ""), refresh_after)
+        except Exception as e:
+            logger.error("Error pre-warming claims: %s", str(e))
+        await asyncio.sleep(PREWARM_INTERVAL)
+
+# View counts are buffered per worker and added to cache.views in one
+# transaction every VIEW_FLUSH_INTERVAL seconds
+pending_views: dict[str, int] = {}
+
+def record_view(claim_id: str):
+    pending_views[claim_id] = pending_views.get(claim_id, 0) + 1
+
+async def flush_views():
+    global pending_views
+    if not pending_views:
+        return
+    views, pending_views = pending_views, {}
+    async with db_pool.writer() as db:
+        await db.executemany(
+            "UPDATE cache SET views = views + ? WHERE id = ?",
+            [(count, claim_id) for claim_id, count in views.items()]
+        )
+        await db.commit()
+
+async def flush_views_periodically():
+    while True:
+        await asyncio.sleep(VIEW_FLUSH_INTERVAL)
+        try:
+            await flush_views()
+        except Exception as e:
+            logger.error("Error flushing view counts: %s", str(e))
+
+async def get_fresh_cached_responses(normalized_queries: list[str]) -> dict[str, dict]:
+    # One query for the whole batch: the list is passed as a single JSON parameter
+    cached = {}
+    async with db_pool.reader() as db:
+        async with db.execute(
+            """
+            SELECT normalized_query, id, response, timestamp FROM cache
+            WHERE normalized_query IN (SELECT value FROM json_each(?))
+            ORDER BY timestamp
+            """,
+            (json.dumps(normalized_queries),)
+        ) as cursor:
+            rows = await cursor.fetchall()
+    for normalized_query, claim_id, response, timestamp in rows:
+        if (time.time() - timestamp) < CACHE_TTL_SECONDS:
+            cached_response = json.loads(response)
+            cached_response['id'] = claim_id
+            cached[normalized_query] = cached_response
+    return cached
+
+def parse_batch_claims(items) -> list[dict]:
+    # Accepts plain strings or {"text": ..., "language": ...} objects
+    if not isinstance(items, list):
+        raise ValueError("Expected a list of claims")
+    claims = []
+    for item in items:
+        if isinstance(item, str):
+            claims.append({"text": item.strip(), "language": None})
+        elif isinstance(item, dict) and isinstance(item.get("text"), str):
+            claims.append({"text": item["text"].strip(), "language": normalize_language(item.get("language"))})
+        else:
+            raise ValueError("Each claim must be a string or an object with a text field")
+    return claims
+
+def parse_batch_lines(lines) -> list[dict]:
+    # JSONL input; lines that aren't JSON are taken as the claim text itself
+    items = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            items.append(line)
+    return parse_batch_claims(items)
+
+async def store_batch_results(results: list[tuple]) -> list[dict]:
+    # One transaction per group of results instead of a commit per claim. The
+    # claims' pending leases are released in the same transaction, and their
+    # inflight futures resolved once it has committed
+    lines = []
+    claim_keys = [get_claim_key(normalized_query) for _, normalized_query, _, _ in results]
+    try:
+        languages = await asyncio.to_thread(
+            lambda: [claim["language"] or detect_language(claim["text"]) for claim, *_ in results]
+        )
+        async with db_pool.writer() as db:
+            for (claim, normalized_query, indices, response), language in zip(results, languages):
+                claim_id = await store_cached_response(
+                    db, claim["text"], normalized_query, response, language
+                )
+                response['id'] = claim_id
+            await db.executemany(
+                "DELETE FROM pending WHERE id = ? AND owner = ?",
+                [(claim_key, get_worker_id()) for claim_key in claim_keys]
+            )
+            await db.commit()
+    except BaseException as e:
+        for claim_key in claim_keys:
+            future = inflight_requests.pop(claim_key, None)
+            if future is not None and not future.done():
+                future.set_exception(e)
+                future.exception()
+        for claim_key in claim_keys:
+            await release_pending_lease(claim_key)
+        raise
+    for claim_key, (claim, normalized_query, indices, response) in zip(claim_keys, results):
+        future = inflight_requests.pop(claim_key, None)
+        if future is not None and not future.done():
+            future.set_result(response)
+        invalidate_claim_entry(response['id'], normalized_query)
+        for index in indices:
+            lines.append({"index": index, "status": "fetched", "result": response})
+    return lines
+
+async def run_factcheck_batch(claims: list[dict], concurrency: int = BATCH_CONCURRENCY):
+    # Yields one result line per input claim, cache hits first, then misses in completion order
+    groups: dict[str, list[int]] = {}
+    for index, claim in enumerate(claims):
+        normalized_query = normalize_claim(claim["text"])
+        if not normalized_query:
+            yield {"index": index, "status": "error", "error": "Claim text is empty"}
+            continue
+        groups.setdefault(normalized_query, []).append(index)
+
+    cached = await get_fresh_cached_responses(list(groups))
+    for normalized_query, cached_response in cached.items():
+        lookup_stats["exact_hits"] += 1
+        for index in groups.pop(normalized_query):
+            yield {"index": index, "status": "cached", "result": cached_response}
+    lookup_stats["misses"] += len(groups)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    completed: asyncio.Queue = asyncio.Queue()
+
+    async def fetch(normalized_query: str, indices: list[int]):
+        claim = claims[indices[0]]
+        claim_key = get_claim_key(normalized_query)
+        async with semaphore:
+            future = inflight_requests.get(claim_key)
+            if future is not None:
+                # Another request is already fetching (and will store) this claim
+                singleflight_stats["coalesced_local"] += 1
+                try:
+                    response = dict(await asyncio.shield(future))
+                except Exception as e:
+                    detail = e.detail if isinstance(e, HTTPException) else str(e)
+                    completed.put_nowait(("error", claim, normalized_query, indices, detail))
+                else:
+                    completed.put_nowait(("stored", claim, normalized_query, indices, response))
+                return
+
+            # Registered like get_ai_response_singleflight, but a fetched answer
+            # keeps its lease and future until store_batch_results commits it
+            future = asyncio.get_running_loop().create_future()
+            inflight_requests[claim_key] = future
+            leased = False
+            try:
+                leased = await acquire_pending_lease(claim_key)
+                if leased:
+                    response = await get_stored_response(normalized_query)
+                    if response is None:
+                        singleflight_stats["upstream_calls"] += 1
+                        async with renewing_lease(claim_key):
+                            response = await get_ai_response(claim["text"])
+                        completed.put_nowait(("fetched", claim, normalized_query, indices, response))
+                        return
+                    # Another worker stored this claim since our cache lookup
+                    await release_pending_lease(claim_key)
+                else:
+                    # Another worker is fetching this claim; wait for its result
+                    response = await fetch_and_store(claim_key, claim["text"], normalized_query, claim["language"])
+                inflight_requests.pop(claim_key, None)
+                future.set_result(response)
+                completed.put_nowait(("stored", claim, normalized_query, indices, dict(response)))
+            except BaseException as e:
+                inflight_requests.pop(claim_key, None)
+                future.set_exception(e)
+                future.exception()
+                if leased:
+                    await release_pending_lease(claim_key)
+                if not isinstance(e, Exception):
+                    raise
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                completed.put_nowait(("error", claim, normalized_query, indices, detail))
+
+    tasks = [asyncio.create_task(fetch(normalized_query, indices)) for normalized_query, indices in groups.items()]
+    remaining = len(tasks)
+    buffer = []
+    buffer_started = 0.0
+    try:
+        while remaining:
+            timeout = None
+            if buffer:
+                timeout = max(0.0, buffer_started + BATCH_COMMIT_INTERVAL - time.monotonic())
+            try:
+                status, claim, normalized_query, indices, payload = await asyncio.wait_for(completed.get(), timeout)
+            except asyncio.TimeoutError:
+                status = None
+            else:
+                remaining -= 1
+                if status == "fetched":
+                    if not buffer:
+                        buffer_started = time.monotonic()
+                    buffer.append((claim, normalized_query, indices, payload))
+                else:
+                    for index in indices:
+                        if status == "stored":
+                            yield {"index": index, "status": "fetched", "result": payload}
+                        else:
+                            yield {"index": index, "status": "error", "error": payload}
+
+            if buffer and (
+                status is None
+                or len(buffer) >= BATCH_COMMIT_SIZE
+                or remaining == 0
+                or time.monotonic() - buffer_started >= BATCH_COMMIT_INTERVAL
+            ):
+                results, buffer = buffer, []
+                for line in await store_batch_results(results):
+                    yield line
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Answers still queued hold a lease and an inflight future until stored
+        while not completed.empty():
+            status, claim, normalized_query, indices, payload = completed.get_nowait()
+            if status == "fetched":
+                buffer.append((claim, normalized_query, indices, payload))
+        if buffer:
+            # Keep answers that were already paid for even if the client went away
+            await store_batch_results(buffer)
+
+# Streaming fact-checks run as background tasks that feed events into a queue,
+# so a client disconnecting mid-stream doesn't waste the upstream call: the
+# result is still cached and shared with any coalesced waiters.
+streaming_tasks: set[asyncio.Task] = set()
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def replay_events(response: dict) -> list[tuple[str, dict]]:
+    return [
+        ("answer", {"text": response.get("answer", "")}),
+        ("sources", {"sources": response.get("sources", [])}),
+        ("classification", {"classification": response.get("classification", "")}),
+        ("result", response),
+    ]
+
+async def stream_and_store(
+    future: asyncio.Future,
+    queue: asyncio.Queue,
+    query_text: str,
+    normalized_query: str,
+    language: Optional[str] = None
+):
+    claim_key = get_claim_key(normalized_query)
+    try:
+        leased = await acquire_pending_lease(claim_key)
+        stored_response = await get_stored_response(normalized_query) if leased else None
+        if stored_response:
+            # Another worker stored this claim since our cache lookup
+            await release_pending_lease(claim_key)
+            response = stored_response
+        elif not leased:
+            # Another worker is already fetching this claim; wait for its result
+            response = await fetch_and_store(claim_key, query_text, normalized_query, language)
+        else:
+            singleflight_stats["upstream_calls"] += 1
+            parser = IncrementalResponseParser()
+            content = []
+            try:
+                async with renewing_lease(claim_key):
+                    async for kind, text in stream_ai_response(query_text):
+                        if kind == "reasoning":
+                            queue.put_nowait(("reasoning", {"text": text}))
+                            continue
+                        content.append(text)
+                        queue.put_nowait(("token", {"text": text}))
+                        for event in parser.feed(text):
+                            queue.put_nowait(event)
+                logger.debug("Response content: %s", "".join(content))
+                try:
+                    with stage_latency.time("parse"):
+                        response = parse_ai_content("".join(content))
+                except Exception:
+                    parse_failures.inc("stream")
+                    raise
+                openrouter_requests.inc("ok")
+            except Exception as e:
+                # Fall back to the non-streaming path, which retries with backoff
+                logger.error(f"Streaming attempt failed: {str(e)}")
+                openrouter_requests.inc(classify_upstream_error(e))
+                openrouter_retries.inc("stream_fallback")
+                await release_pending_lease(claim_key)
+                queue.put_nowait(("retry", {}))
+                response = await fetch_and_store(claim_key, query_text, normalized_query, language)
+            except BaseException:
+                await release_pending_lease(claim_key)
+                raise
+            else:
+                try:
+                    language = await resolve_language(query_text, language)
+                    with stage_latency.time("store"):
+                        async with db_pool.writer() as db:
+                            claim_id = await store_cached_response(db, query_text, normalized_query, response, language)
+                            await db.execute(
+                                "DELETE FROM pending WHERE id = ? AND owner = ?",
+                                (claim_key, get_worker_id())
+                            )
+                            await db.commit()
+                except BaseException:
+                    # Free the lease so waiting workers take over instead of polling until it expires
+                    await release_pending_lease(claim_key)
+                    raise
+                invalidate_claim_entry(claim_id, normalized_query)
+                response['id'] = claim_id
+
+        future.set_result(response)
+        queue.put_nowait(("result", dict(response)))
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()
+        detail = e.detail if isinstance(e, HTTPException) else "Service temporarily unavailable. Please try again later."
+        queue.put_nowait(("error", {"detail": detail}))
+        if not isinstance(e, Exception):
+            raise
+    finally:
+        inflight_requests.pop(claim_key, None)
+        queue.put_nowait(None)
 
 # Routes
 @app.get("/robots.txt")
 async def get_robots(request: Request):
-    base_url = str(request.base_url).rstrip('/')
+    base_url = sitemap_store.site_url or str(request.base_url).rstrip('/')
     return PlainTextResponse(f"""User-agent: *
 Allow: /
 Allow: /history
@@ -191,47 +2069,234 @@ Allow: /claim/*/view
 
 Sitemap: {base_url}/sitemap.xml""")
 
-@app.get("/sitemap.xml")
-async def get_sitemap(request: Request):
-    base_url = str(request.base_url).rstrip('/')
+# Sitemaps are pre-generated and kept gzipped in memory, so a crawler hit costs
+# the same however large the cache grows. Claims are split into shards of
+# SITEMAP_SHARD_SIZE consecutive rowids; rows are updated in place, so a
+# claim never moves between shards and only the shards touched since the last
+# refresh (found through idx_cache_updated_at) are rebuilt.
+class SitemapArtifact:
+    def __init__(self, xml: str, last_modified: float):
+        self.body = gzip.compress(xml.encode("utf-8"), 6, mtime=0)
+        self.etag = 'W/"' + hashlib.sha1(self.body).hexdigest()[:16] + '"'
+        self.last_modified = int(last_modified)
+
+class SitemapStore:
+    def __init__(self, shard_size: int):
+        self.shard_size = shard_size
+        self.site_url: Optional[str] = SITE_URL.rstrip("/") if SITE_URL else None
+        # Without SITE_URL the sitemaps are built once around a placeholder that
+        # serve_sitemap swaps for the requesting host, so no host (forged or not)
+        # changes what other crawlers see or triggers a rebuild
+        self.base_url = self.site_url or SITEMAP_PLACEHOLDER_URL
+        self.artifacts: dict[str, SitemapArtifact] = {}
+        self.shard_lastmod: dict[int, float] = {}
+        self.refreshed_at: Optional[float] = None
+        # Created on first use so they bind to the server's event loop
+        self._lock: Optional[asyncio.Lock] = None
+        self._dirty: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._dirty = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def mark_dirty(self):
+        if self._dirty is not None:
+            self._dirty.set()
+
+    async def run(self):
+        # Local writes trigger a refresh after a short debounce; the periodic
+        # timeout picks up claims written by other workers
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error("Error building sitemap: %s", str(e))
+        while True:
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout=SITEMAP_REFRESH_INTERVAL)
+                await asyncio.sleep(SITEMAP_REBUILD_DELAY)
+            except asyncio.TimeoutError:
+                pass
+            self._dirty.clear()
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Error refreshing sitemap: %s", str(e))
+
+    async def ensure_built(self):
+        # Only waits for the startup build, or retries it if that failed
+        if self.refreshed_at is None:
+            await self.refresh()
+
+    async def refresh(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            started = time.time()
+            async with db_pool.reader() as db:
+                if self.refreshed_at is None:
+                    async with db.execute("SELECT MAX(rowid) FROM cache") as cursor:
+                        max_rowid = (await cursor.fetchone())[0] or 0
+                    shards = range(1, (max_rowid - 1) // self.shard_size + 2) if max_rowid else []
+                else:
+                    # Allow for writes that stamped updated_at before our last refresh
+                    # but committed after it; rebuilding an unchanged shard is harmless
+                    async with db.execute(
+                        "SELECT DISTINCT (rowid - 1) / ? + 1 FROM cache WHERE updated_at > ?",
+                        (self.shard_size, self.refreshed_at - 60)
+                    ) as cursor:
+                        shards = [row[0] for row in await cursor.fetchall()]
+                for shard in shards:
+                    await self.build_shard(db, shard)
+            if shards or self.refreshed_at is None:
+                self.build_index()
+            self.refreshed_at = started
+
+    async def build_shard(self, db, shard: int):
+        first_rowid = (shard - 1) * self.shard_size + 1
+        async with db.execute(
+            """
+            SELECT id, COALESCE(updated_at, timestamp) FROM cache
+            WHERE rowid BETWEEN ? AND ? ORDER BY rowid
+            """,
+            (first_rowid, first_rowid + self.shard_size - 1)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        name = f"sitemap-claims-{shard}.xml"
+        if not rows:
+            self.artifacts.pop(name, None)
+            self.shard_lastmod.pop(shard, None)
+            return
+        urls = [
+            {
+                "loc": f"{self.base_url}/claim/{claim_id}/view",
+                "lastmod": datetime.utcfromtimestamp(updated_at).strftime("%Y-%m-%d"),
+                "changefreq": "weekly",
+                "priority": "0.6"
+            }
+            for claim_id, updated_at in rows
+        ]
+        last_modified = max(updated_at for _, updated_at in rows)
+        self.artifacts[name] = await asyncio.to_thread(
+            SitemapArtifact, generate_sitemap(urls), last_modified
+        )
+        self.shard_lastmod[shard] = last_modified
+
+    def build_index(self):
+        last_modified = max(self.shard_lastmod.values(), default=0)
+        pages = [
+            {"loc": f"{self.base_url}/", "changefreq": "daily", "priority": "1.0"},
+            {"loc": f"{self.base_url}/history", "changefreq": "hourly", "priority": "0.8"}
+        ]
+        self.artifacts["sitemap-pages.xml"] = SitemapArtifact(generate_sitemap(pages), last_modified)
+        sitemaps = [{"loc": f"{self.base_url}/sitemap-pages.xml"}] + [
+            {
+                "loc": f"{self.base_url}/sitemap-claims-{shard}.xml",
+                "lastmod": datetime.utcfromtimestamp(self.shard_lastmod[shard]).strftime("%Y-%m-%d")
+            }
+            for shard in sorted(self.shard_lastmod)
+        ]
+        self.artifacts["sitemap.xml"] = SitemapArtifact(generate_sitemap_index(sitemaps), last_modified)
+
+sitemap_store = SitemapStore(SITEMAP_SHARD_SIZE)
+
+def generate_sitemap(urls):
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    ]
+    for url in urls:
+        parts.append('  <url>\n')
+        parts.append(f'    <loc>{html.escape(url["loc"], quote=False)}</loc>\n')
+        if "lastmod" in url:
+            parts.append(f'    <lastmod>{url["lastmod"]}</lastmod>\n')
+        parts.append(f'    <changefreq>{url["changefreq"]}</changefreq>\n')
+        parts.append(f'    <priority>{url["priority"]}</priority>\n')
+        parts.append('  </url>\n')
+    parts.append('</urlset>')
+    return "".join(parts)
+
+def generate_sitemap_index(sitemaps):
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    ]
+    for sitemap in sitemaps:
+        parts.append('  <sitemap>\n')
+        parts.append(f'    <loc>{html.escape(sitemap["loc"], quote=False)}</loc>\n')
+        if "lastmod" in sitemap:
+            parts.append(f'    <lastmod>{sitemap["lastmod"]}</lastmod>\n')
+        parts.append('  </sitemap>\n')
+    parts.append('</sitemapindex>')
+    return "".join(parts)
+
+def is_not_modified(request: Request, artifact: SitemapArtifact, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return artifact.last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+async def serve_sitemap(request: Request, name: str):
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute(
-                "SELECT id, timestamp FROM cache ORDER BY timestamp DESC LIMIT 1000"
-            ) as cursor:
-                claims = await cursor.fetchall()
-                base_urls = [
-                    {"loc": f"{base_url}/", "changefreq": "daily", "priority": "1.0"},
-                    {"loc": f"{base_url}/history", "changefreq": "hourly", "priority": "0.8"}
-                ]
-                claim_urls = [
-                    {
-                        "loc": f"{base_url}/claim/{claim[0]}/view",
-                        "lastmod": datetime.fromtimestamp(claim[1]).strftime("%Y-%m-%d"),
-                        "changefreq": "weekly",
-                        "priority": "0.6"
-                    }
-                    for claim in claims
-                ]
-                sitemap = generate_sitemap(base_urls + claim_urls)
-                return Response(content=sitemap, media_type="application/xml")
+        await sitemap_store.ensure_built()
+        artifact = sitemap_store.artifacts.get(name)
+        if artifact is None:
+            raise HTTPException(status_code=404, detail="Sitemap not found")
+        base_url = None
+        etag = artifact.etag
+        if sitemap_store.site_url is None:
+            base_url = str(request.base_url).rstrip('/')
+            etag = f'{etag[:-1]}-{hashlib.sha1(base_url.encode()).hexdigest()[:8]}"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(artifact.last_modified, usegmt=True),
+            "Cache-Control": "public, max-age=3600",
+            "Vary": "Accept-Encoding" if base_url is None else "Accept-Encoding, Host"
+        }
+        if is_not_modified(request, artifact, etag):
+            return Response(status_code=304, headers=headers)
+        if base_url is not None:
+            # Same cost as serving an uncompressed prebuilt sitemap: one decompress and a scan
+            content = gzip.decompress(artifact.body).replace(
+                SITEMAP_PLACEHOLDER_URL.encode(), html.escape(base_url, quote=False).encode()
+            )
+            return Response(content=content, media_type="application/xml", headers=headers)
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=artifact.body, media_type="application/xml", headers=headers)
+        return Response(content=gzip.decompress(artifact.body), media_type="application/xml", headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Error generating sitemap: %s", str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
-def generate_sitemap(urls):
-    sitemap = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    sitemap += '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
-    for url in urls:
-        sitemap += '  <url>\n'
-        sitemap += f'    <loc>{url["loc"]}</loc>\n'
-        if "lastmod" in url:
-            sitemap += f'    <lastmod>{url["lastmod"]}</lastmod>\n'
-        sitemap += f'    <changefreq>{url["changefreq"]}</changefreq>\n'
-        sitemap += f'    <priority>{url["priority"]}</priority>\n'
-        sitemap += '  </url>\n'
-    sitemap += '</urlset>'
-    return sitemap
+@app.get("/sitemap.xml")
+async def get_sitemap(request: Request):
+    return await serve_sitemap(request, "sitemap.xml")
+
+@app.get("/sitemap-pages.xml")
+async def get_sitemap_pages(request: Request):
+    return await serve_sitemap(request, "sitemap-pages.xml")
+
+@app.get("/sitemap-claims-{shard:int}.xml")
+async def get_sitemap_shard(request: Request, shard: int):
+    return await serve_sitemap(request, f"sitemap-claims-{shard}.xml")
 
 # Serve HTML pages with caching headers
 @app.get("/")
@@ -265,22 +2330,39 @@ async def get_history_page():
     )
 
 @app.get("/claim/{claim_id}")
-async def get_claim(claim_id: str = Path(..., min_length=8, max_length=8, pattern=r'^[a-zA-Z0-9]+$')):
+async def get_claim(
+    request: Request,
+    claim_id: str = Path(..., min_length=8, max_length=8, pattern=r'^[a-zA-Z0-9]+$')
+):
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute(
-                "SELECT query, response FROM cache WHERE id = ?",
-                (claim_id,)
-            ) as cursor:
-                result = await cursor.fetchone()
-                if not result:
-                    raise HTTPException(status_code=404, detail="Claim not found")
-                
-                response_data = json.loads(result[1])
-                response_data['id'] = claim_id
-                response_data['query'] = result[0]
-                return response_data
+        entry = hot_cache.get(f"id:{claim_id}")
+        if entry is None:
+            async with db_pool.reader() as db:
+                async with db.execute(
+                    "SELECT query, normalized_query, response, timestamp FROM cache WHERE id = ?",
+                    (claim_id,)
+                ) as cursor:
+                    result = await cursor.fetchone()
+            if not result:
+                raise HTTPException(status_code=404, detail="Claim not found")
+            entry = cache_claim_entry(claim_id, result[0], result[1], result[2], result[3])
+
+        record_view(claim_id)
+        headers = {
+            "ETag": entry["etag"],
+            "Cache-Control": f"public, max-age={CLAIM_CACHE_MAX_AGE}"
+        }
+        if_none_match = request.headers.get("if-none-match", "")
+        if entry["etag"] in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+
+        response_data = dict(entry["response"])
+        response_data['id'] = claim_id
+        response_data['query'] = entry["query"]
+        return JSONResponse(content=response_data, headers=headers)
                 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Error retrieving claim: %s", str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -289,99 +2371,447 @@ async def get_claim(claim_id: str = Path(..., min_length=8, max_length=8, patter
 async def factcheck(query: Query):
     try:
         sanitized_text = query.text.strip()
-        
-        async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute(
-                "SELECT id, response, timestamp FROM cache WHERE query = ?",
-                (query.text,)
-            ) as cursor:
-                result = await cursor.fetchone()
-                
-                if result and (time.time() - result[2]) < 86400:
-                    cached_response = json.loads(result[1])
-                    cached_response['id'] = result[0]
-                    return cached_response
+        normalized_query = normalize_claim(sanitized_text)
+        if not normalized_query:
+            raise HTTPException(status_code=400, detail="Claim text is empty")
 
-        response = await get_ai_response(query.text)
-        
-        async with aiosqlite.connect(DB_PATH) as db:
-            claim_id = hashlib.sha256(query.text.encode()).hexdigest()[:8]
-            
-            await db.execute(
-                "INSERT OR REPLACE INTO cache (id, query, response, timestamp) VALUES (?, ?, ?, ?)",
-                (claim_id, query.text, json.dumps(response), time.time())
-            )
-            await db.commit()
-            
-            response['id'] = claim_id
-            
-        return response
+        with stage_latency.time("lookup"):
+            cached_response = await lookup_cached_response(normalized_query)
+        if cached_response:
+            return cached_response
+
+        with stage_latency.time("upstream"):
+            return await get_ai_response_singleflight(sanitized_text, normalized_query, query.language)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Error in factcheck: %s\n%s", str(e), traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
+@app.post("/factcheck/stream")
+async def factcheck_stream(query: Query):
+    sanitized_text = query.text.strip()
+    normalized_query = normalize_claim(sanitized_text)
+    if not normalized_query:
+        raise HTTPException(status_code=400, detail="Claim text is empty")
+
+    cached_response = await lookup_cached_response(normalized_query)
+    claim_key = get_claim_key(normalized_query)
+    future = None
+    queue = None
+    if not cached_response:
+        future = inflight_requests.get(claim_key)
+        if future is not None:
+            singleflight_stats["coalesced_local"] += 1
+        else:
+            # Register the in-flight future before yielding so identical requests coalesce onto it
+            future = asyncio.get_running_loop().create_future()
+            inflight_requests[claim_key] = future
+            queue = asyncio.Queue()
+            task = asyncio.create_task(
+                stream_and_store(future, queue, sanitized_text, normalized_query, query.language)
+            )
+            streaming_tasks.add(task)
+            task.add_done_callback(streaming_tasks.discard)
+
+    async def event_stream():
+        # Send something immediately so the client sees the first byte without waiting on the model
+        yield format_sse("start", {})
+        if cached_response:
+            for event, data in replay_events(cached_response):
+                yield format_sse(event, data)
+        elif queue is None:
+            try:
+                response = dict(await asyncio.shield(future))
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else "Service temporarily unavailable. Please try again later."
+                yield format_sse("error", {"detail": detail})
+                return
+            for event, data in replay_events(response):
+                yield format_sse(event, data)
+        else:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield format_sse(*item)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@app.post("/factcheck/batch")
+async def factcheck_batch(request: Request, concurrency: int = BATCH_CONCURRENCY):
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Upload a JSONL file in the 'file' field")
+            claims = parse_batch_lines((await upload.read()).decode("utf-8").splitlines())
+        elif "ndjson" in content_type or "jsonl" in content_type:
+            claims = parse_batch_lines((await request.body()).decode("utf-8").splitlines())
+        else:
+            body = await request.json()
+            claims = parse_batch_claims(body.get("claims") if isinstance(body, dict) else body)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch: {str(e)}")
+
+    if not claims:
+        raise HTTPException(status_code=400, detail="No claims provided")
+    if len(claims) > BATCH_MAX_CLAIMS:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {BATCH_MAX_CLAIMS} claims")
+
+    async def result_lines():
+        async for line in run_factcheck_batch(claims, min(concurrency, BATCH_MAX_CONCURRENCY)):
+            yield json.dumps(line) + "\n"
+
+    return StreamingResponse(result_lines(), media_type="application/x-ndjson")
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    lookups = sum(lookup_stats.values())
+    hits = lookups - lookup_stats["misses"]
+    return {
+        "lookups": {
+            **lookup_stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "near_duplicate_hit_rate": round(lookup_stats["near_duplicate_hits"] / lookups, 4) if lookups else 0.0
+        },
+        "near_duplicate": {
+            "enabled": near_duplicate_index is not None,
+            "threshold": NEAR_DUPLICATE_THRESHOLD,
+            "indexed_claims": len(near_duplicate_index.entries) if near_duplicate_index is not None else 0
+        },
+        "hot_cache": {
+            **hot_cache.stats,
+            "entries": len(hot_cache.entries),
+            "bytes": hot_cache.bytes,
+            "max_bytes": hot_cache.max_bytes
+        },
+        "singleflight": {
+            **singleflight_stats,
+            "in_flight": len(inflight_requests)
+        },
+        "refresh": {
+            **refresh_queue.stats,
+            "pending": len(refresh_queue.pending),
+            "buffered_views": sum(pending_views.values())
+        }
+    }
+
+def get_cache_hit_ratio() -> dict:
+    lookups = sum(lookup_stats.values())
+    hits = lookups - lookup_stats["misses"]
+    return {(): hits / lookups if lookups else 0.0}
+
+CallbackMetric(
+    "factcheck_cache_lookups_total", "Fact-check cache lookups by result", "counter", ("result",),
+    lambda: {(result,): value for result, value in lookup_stats.items()}
+)
+CallbackMetric(
+    "factcheck_cache_hit_ratio", "Share of fact-check lookups answered from the cache", "gauge", (),
+    get_cache_hit_ratio
+)
+CallbackMetric(
+    "hot_cache_events_total", "In-process hot cache events", "counter", ("event",),
+    lambda: {(event,): value for event, value in hot_cache.stats.items()}
+)
+CallbackMetric(
+    "hot_cache_bytes", "Approximate size of the in-process hot cache", "gauge", (),
+    lambda: {(): hot_cache.bytes}
+)
+CallbackMetric(
+    "singleflight_events_total", "Upstream calls and requests coalesced onto them", "counter", ("event",),
+    lambda: {(event,): value for event, value in singleflight_stats.items()}
+)
+CallbackMetric(
+    "refresh_events_total", "Background stale-while-revalidate refreshes", "counter", ("event",),
+    lambda: {(event,): value for event, value in refresh_queue.stats.items()}
+)
+CallbackMetric(
+    "singleflight_in_flight", "Fact-checks currently waiting on OpenRouter", "gauge", (),
+    lambda: {(): len(inflight_requests)}
+)
+
+@app.get("/metrics")
+async def get_metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(render_metrics(get_worker_id()), media_type="text/plain; version=0.0.4")
+
+# Verdict and language counts for /api/stats, reused for HISTORY_COUNT_TTL seconds
+stats_cache: dict[str, tuple[dict, float]] = {}
+
+@app.get("/api/stats")
+async def get_stats():
+    try:
+        cached = stats_cache.get("stats")
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        async with db_pool.reader() as db:
+            async with db.execute(
+                "SELECT classification, COUNT(*) FROM cache GROUP BY classification ORDER BY COUNT(*) DESC"
+            ) as cursor:
+                classifications = {row[0] or "Unknown": row[1] for row in await cursor.fetchall()}
+            async with db.execute(
+                "SELECT language, COUNT(*) FROM cache GROUP BY language ORDER BY COUNT(*) DESC"
+            ) as cursor:
+                languages = {row[0] or "unknown": row[1] for row in await cursor.fetchall()}
+            total_items = await get_total_count(db)
+
+        stats = {
+            "total_items": total_items,
+            "classifications": classifications,
+            "languages": languages
+        }
+        stats_cache["stats"] = (stats, time.monotonic() + HISTORY_COUNT_TTL)
+        return stats
+
+    except Exception as e:
+        logger.error("Error retrieving stats: %s", str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+def build_pagination(page: int, per_page: int, total_items: int) -> dict:
+    return {
+        "current_page": page,
+        "per_page": per_page,
+        "total_items": total_items,
+        "total_pages": max(1, (total_items + per_page - 1) // per_page)
+    }
+
+def build_fts_query(search: str) -> Optional[str]:
+    # Quote every term so user input can't inject FTS5 syntax; the last term is a
+    # prefix match so results update while the user is still typing
+    terms = normalize_claim(search).split()
+    if not terms:
+        return None
+    quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def render_snippet(snippet: Optional[str]) -> Optional[str]:
+    # snippet() marks matches with \x02/\x03 so the text can be escaped before adding <mark>
+    if not snippet:
+        return None
+    return html.escape(snippet).replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+# Short-lived counts for filtered history listings, keyed on the filter
+history_count_cache: dict[tuple, tuple[int, float]] = {}
+
+async def get_cached_count(db, key: tuple, count_query: str, params: list) -> int:
+    now = time.monotonic()
+    cached = history_count_cache.get(key)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    async with db.execute(count_query, params) as cursor:
+        value = (await cursor.fetchone())[0]
+    if len(history_count_cache) >= 1024:
+        history_count_cache.clear()
+    history_count_cache[key] = (value, now + HISTORY_COUNT_TTL)
+    return value
+
+async def get_total_count(db) -> int:
+    async with db.execute("SELECT value FROM cache_counts WHERE name = 'total'") as cursor:
+        result = await cursor.fetchone()
+    if result is None:
+        return await get_cached_count(db, ("total",), "SELECT COUNT(*) FROM cache", [])
+    return result[0]
+
+def parse_history_cursor(after: str) -> tuple[float, str]:
+    # Cursors look like "<timestamp>,<id>" and point at the last row already shown
+    timestamp, _, claim_id = after.rpartition(",")
+    try:
+        return float(timestamp), claim_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def format_history_cursor(timestamp: float, claim_id: str) -> str:
+    return f"{timestamp!r},{claim_id}"
+
+async def search_history_fts(
+    db,
+    fts_query: str,
+    page: int,
+    per_page: int,
+    offset: int,
+    classification: Optional[str] = None
+) -> dict:
+    filter_sql = " AND cache.classification = ?" if classification else ""
+    filter_params = [classification] if classification else []
+
+    total_items = await get_cached_count(
+        db,
+        ("fts", fts_query, classification),
+        f"""
+        SELECT COUNT(*) FROM cache_fts
+        JOIN cache ON cache.rowid = cache_fts.rowid
+        WHERE cache_fts MATCH ?{filter_sql}
+        """,
+        [fts_query, *filter_params]
+    )
+
+    # BM25 weights: claim text matters most, then the answer, then sources
+    async with db.execute(
+        f"""
+        SELECT cache.id, cache.query, cache.classification,
+               snippet(cache_fts, -1, char(2), char(3), '…', 16)
+        FROM cache_fts
+        JOIN cache ON cache.rowid = cache_fts.rowid
+        WHERE cache_fts MATCH ?{filter_sql}
+        ORDER BY bm25(cache_fts, 10.0, 2.0, 1.0)
+        LIMIT ? OFFSET ?
+        """,
+        (fts_query, *filter_params, per_page, offset)
+    ) as cursor:
+        results = await cursor.fetchall()
+
+    claims = []
+    for row in results:
+        claims.append({
+            "id": row[0],
+            "query": row[1],
+            "classification": row[2],
+            "snippet": render_snippet(row[3])
+        })
+
+    return {
+        "claims": claims,
+        "pagination": build_pagination(page, per_page, total_items)
+    }
+
 @app.get("/api/history")
 async def get_history(
     page: int = 1,
     per_page: int = 10,
-    search: str = None
+    search: str = None,
+    after: str = None,
+    classification: str = None
 ):
     try:
         # Validate and limit per_page
-        per_page = min(per_page, 100)
+        per_page = max(1, min(per_page, 100))
         offset = (page - 1) * per_page
+        # Cursor pagination applies to the chronological listing; ranked search uses pages
+        cursor_position = parse_history_cursor(after) if after and not search else None
+        classification = normalize_classification(classification) if classification else None
+
+        fts_query = build_fts_query(search) if search and search_index_available else None
+
+        async with db_pool.reader() as db:
+            if fts_query:
+                try:
+                    return await search_history_fts(db, fts_query, page, per_page, offset, classification)
+                except sqlite3.OperationalError as e:
+                    logger.warning("FTS search failed, falling back to LIKE: %s", str(e))
 
-        async with aiosqlite.connect(DB_PATH) as db:
             # Build query based on search parameter
-            count_query = "SELECT COUNT(*) FROM cache"
             data_query = """
-                SELECT id, query, response 
+                SELECT id, query, classification, timestamp
                 FROM cache 
             """
             
+            conditions = []
             params = []
             if search:
-                count_query += " WHERE query LIKE ?"
-                data_query += " WHERE query LIKE ?"
+                conditions.append("query LIKE ?")
                 search_param = f"%{search}%"
                 params.append(search_param)
-            
-            data_query += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
-            params.extend([per_page, offset])
-            
+            if classification:
+                conditions.append("classification = ?")
+                params.append(classification)
+
             # Get total count
-            async with db.execute(count_query, params[:1] if search else []) as cursor:
-                total_items = (await cursor.fetchone())[0]
+            if conditions:
+                total_items = await get_cached_count(
+                    db,
+                    ("like", search, classification),
+                    "SELECT COUNT(*) FROM cache WHERE " + " AND ".join(conditions),
+                    list(params)
+                )
+            else:
+                total_items = await get_total_count(db)
+
+            if cursor_position:
+                conditions.append("(timestamp, id) < (?, ?)")
+                params.extend(cursor_position)
+            if conditions:
+                data_query += " WHERE " + " AND ".join(conditions)
+
+            # Fetch one extra row to know whether there is a next page
+            data_query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+            params.append(per_page + 1)
+            if not cursor_position:
+                data_query += " OFFSET ?"
+                params.append(offset)
 
             # Get paginated data
             async with db.execute(data_query, params) as cursor:
                 results = await cursor.fetchall()
                 
                 claims = []
-                for row in results:
-                    response_data = json.loads(row[2])
+                for row in results[:per_page]:
                     claims.append({
                         "id": row[0],
                         "query": row[1],
-                        "classification": response_data["classification"]
+                        "classification": row[2]
                     })
-                
+
+                pagination = build_pagination(page, per_page, total_items)
+                pagination["next_cursor"] = (
+                    format_history_cursor(results[per_page - 1][3], results[per_page - 1][0])
+                    if len(results) > per_page else None
+                )
                 return {
                     "claims": claims,
-                    "pagination": {
-                        "current_page": page,
-                        "per_page": per_page,
-                        "total_items": total_items,
-                        "total_pages": max(1, (total_items + per_page - 1) // per_page)
-                    }
+                    "pagination": pagination
                 }
                 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Error retrieving history: %s", str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+async def run_batch_cli(args):
+    await init_db()
+    await db_pool.open()
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        if args.input == "-":
+            claims = parse_batch_lines(sys.stdin)
+        else:
+            with open(args.input, encoding="utf-8") as source:
+                claims = parse_batch_lines(source)
+        async for line in run_factcheck_batch(claims, args.concurrency):
+            output.write(json.dumps(line, ensure_ascii=False) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        await get_http_client().aclose()
+        await db_pool.close()
+
 if __name__ == "__main__":
-    import uvicorn
-    port = int(os.getenv("PORT", "8000"))
-    uvicorn.run("app.main:app", host="0.0.0.0", port=port)
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        parser = argparse.ArgumentParser(
+            prog="main.py batch",
+            description="Fact-check every claim in a JSONL file and write NDJSON results"
+        )
+        parser.add_argument("input", help="JSONL file of claims, or - for stdin")
+        parser.add_argument("-o", "--output", default="-", help="NDJSON output file (default: stdout)")
+        parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY)
+        asyncio.run(run_batch_cli(parser.parse_args(sys.argv[2:])))
+    else:
+        import uvicorn
+        port = int(os.getenv("PORT", "8000"))
+        uvicorn.run("app.main:app", host="0.0.0.0", port=port)
@@ -154,6 +154,33 @@ document.addEventListener('DOMContentLoaded', () => {
         currentLoadingMessage = 0;
     }
 
+    // Read Server-Sent Events from a streaming POST response
+    async function readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let data = '';
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+
     // Send message function
     async function sendMessage() {
         const text = userInput.value.trim();
@@ -167,8 +194,12 @@ document.addEventListener('DOMContentLoaded', () => {
         console.log('Starting fact check request...');
         showLoadingMessage();
 
+        // Partial answer shown while the response streams in
+        let liveMessage = null;
+        let result = null;
+
         try {
-            const response = await fetch('/factcheck', {
+            const response = await fetch('/factcheck/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -176,19 +207,50 @@ document.addEventListener('DOMContentLoaded', () => {
                 body: JSON.stringify({ text }),
             });
 
-            if (!response.ok) {
+            if (!response.ok || !response.body) {
                 throw new Error('Network response was not ok');
             }
 
-            console.log('Got response, parsing JSON...');
-            const data = await response.json();
+            await readEventStream(response, (event, data) => {
+                if (event === 'answer' && data.text) {
+                    if (!liveMessage) {
+                        hideLoadingMessage();
+                        liveMessage = createMessageElement('');
+                        messagesContainer.appendChild(liveMessage);
+                    }
+                    liveMessage.textContent += data.text;
+                    messagesContainer.scrollTop = messagesContainer.scrollHeight;
+                } else if (event === 'retry' && liveMessage) {
+                    // The streamed reply couldn't be parsed; the server is fetching it again
+                    liveMessage.remove();
+                    liveMessage = null;
+                    showLoadingMessage();
+                } else if (event === 'result') {
+                    result = data;
+                } else if (event === 'error') {
+                    throw new Error(data.detail);
+                }
+            });
+
+            if (!result) {
+                throw new Error('Stream ended without a result');
+            }
+
             console.log('Hiding loading message and showing response');
             hideLoadingMessage();
-            messagesContainer.appendChild(createResponseElement(data));
+            const responseElement = createResponseElement(result);
+            if (liveMessage) {
+                liveMessage.replaceWith(responseElement);
+            } else {
+                messagesContainer.appendChild(responseElement);
+            }
             messagesContainer.scrollTop = messagesContainer.scrollHeight;
         } catch (error) {
             console.error('Error during request:', error);
             hideLoadingMessage();
+            if (liveMessage) {
+                liveMessage.remove();
+            }
             messagesContainer.appendChild(createMessageElement('Sorry, there was an error processing your request.'));
         }
     }
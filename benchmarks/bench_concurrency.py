@@ -0,0 +1,104 @@
+"""Show that slow /factcheck misses no longer block cached reads.
+
+Starts the app under uvicorn against a temporary database and a local
+OpenRouter stand-in, fires a burst of concurrent cache misses and measures
+the latency of cached /claim/{id} reads issued while the misses are in flight.
+
+    python benchmarks/bench_concurrency.py --misses 20 --latency 2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openrouter import start_fake_openrouter
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def start_app(port):
+    import uvicorn
+
+    config = uvicorn.Config("app.main:app", host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run(args):
+    import httpx
+
+    base = f"http://127.0.0.1:{args.port}"
+    async with httpx.AsyncClient(base_url=base, timeout=120) as client:
+        seeded = await client.post("/factcheck", json={"text": "benchmark seed claim"})
+        seeded.raise_for_status()
+        claim_id = seeded.json()["id"]
+
+        async def miss(i):
+            start = time.perf_counter()
+            response = await client.post("/factcheck", json={"text": f"cold claim {i} {time.time()}"})
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        async def cached_reads():
+            latencies = []
+            deadline = time.perf_counter() + args.latency
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get(f"/claim/{claim_id}")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        started = time.perf_counter()
+        miss_tasks = [asyncio.create_task(miss(i)) for i in range(args.misses)]
+        await asyncio.sleep(0.1)
+        reads = await cached_reads()
+        misses = await asyncio.gather(*miss_tasks)
+        elapsed = time.perf_counter() - started
+
+    print(f"{args.misses} concurrent misses at {args.latency:.1f}s upstream latency")
+    print(f"  misses finished in      {elapsed:.2f}s (max miss {max(misses):.2f}s)")
+    print(f"  cached reads completed  {len(reads)}")
+    print(f"  cached read p50         {percentile(reads, 50) * 1000:.1f} ms")
+    print(f"  cached read p99         {percentile(reads, 99) * 1000:.1f} ms")
+    print(f"  cached read mean        {statistics.mean(reads) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--misses", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    stub = start_fake_openrouter(latency=args.latency)
+    workdir = tempfile.mkdtemp(prefix="factcheck-bench-")
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "factcheck.db")
+    os.environ["OPENROUTER_URL"] = stub.url
+    os.environ["OPENROUTER_API_KEY"] = "benchmark"
+    os.environ["OPENROUTER_MAX_CONNECTIONS"] = str(max(args.misses, 1))
+
+    start_app(args.port)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("app.main").setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Compare per-request SQLite connections with the shared DatabasePool.
+
+Seeds two temporary databases with the same rows and runs an identical
+mixed read/write workload against each: the "before" pattern opens a new
+aiosqlite connection per operation in rollback-journal mode, the "after"
+pattern goes through app.main.DatabasePool (WAL, one writer, N readers).
+
+    python benchmarks/bench_db_pool.py --rows 20000 --operations 5000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORKDIR = tempfile.mkdtemp(prefix="factcheck-bench-")
+os.environ.setdefault("DATABASE_PATH", os.path.join(WORKDIR, "app.db"))
+
+import aiosqlite
+
+from app.main import DatabasePool
+
+RESPONSE = json.dumps({
+    "answer": "Benchmark answer " * 40,
+    "sources": ["Quran 2:256", "Sahih al-Bukhari 1"],
+    "classification": "Misleading",
+})
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def seed(path, rows):
+    async with aiosqlite.connect(path) as db:
+        await db.execute(
+            "CREATE TABLE cache (id TEXT PRIMARY KEY, query TEXT UNIQUE, normalized_query TEXT, response TEXT, timestamp REAL)"
+        )
+        now = time.time()
+        await db.executemany(
+            "INSERT INTO cache (id, query, normalized_query, response, timestamp) VALUES (?, ?, ?, ?, ?)",
+            [(f"{i:08x}", f"claim {i}", f"claim {i}", RESPONSE, now - i) for i in range(rows)]
+        )
+        await db.commit()
+
+
+async def read_claim(db, rows):
+    async with db.execute("SELECT query, response FROM cache WHERE id = ?", (f"{random.randrange(rows):08x}",)) as cursor:
+        row = await cursor.fetchone()
+    json.loads(row[1])
+
+
+async def read_history(db, rows):
+    async with db.execute(
+        "SELECT id, query, response FROM cache ORDER BY timestamp DESC LIMIT 10 OFFSET ?",
+        (random.randrange(100) * 10,)
+    ) as cursor:
+        await cursor.fetchall()
+
+
+async def write_claim(db, rows):
+    await db.execute(
+        "UPDATE cache SET response = ?, timestamp = ? WHERE id = ?",
+        (RESPONSE, time.time(), f"{random.randrange(rows):08x}")
+    )
+    await db.commit()
+
+
+async def run_workload(args, open_reader, open_writer):
+    random.seed(42)
+    plan = random.choices(["claim", "history", "write"], weights=[60, 30, args.write_percent], k=args.operations)
+    latencies = {"claim": [], "history": [], "write": []}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def operation(kind):
+        async with semaphore:
+            start = time.perf_counter()
+            if kind == "write":
+                async with open_writer() as db:
+                    await write_claim(db, args.rows)
+            else:
+                async with open_reader() as db:
+                    await (read_claim if kind == "claim" else read_history)(db, args.rows)
+            latencies[kind].append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(operation(kind) for kind in plan))
+    return time.perf_counter() - started, latencies
+
+
+def report(label, elapsed, latencies, operations):
+    print(f"{label}: {operations / elapsed:.0f} ops/s")
+    for kind, values in latencies.items():
+        if values:
+            print(
+                f"  {kind:<8} n={len(values):<6} p50={percentile(values, 50) * 1000:7.2f} ms"
+                f"  p99={percentile(values, 99) * 1000:7.2f} ms"
+            )
+
+
+async def main(args):
+    before_path = os.path.join(WORKDIR, "before.db")
+    after_path = os.path.join(WORKDIR, "after.db")
+    await seed(before_path, args.rows)
+    await seed(after_path, args.rows)
+
+    def connect_per_request():
+        return aiosqlite.connect(before_path, timeout=30)
+
+    elapsed, latencies = await run_workload(args, connect_per_request, connect_per_request)
+    report("before (connection per request, rollback journal)", elapsed, latencies, args.operations)
+
+    pool = DatabasePool(after_path, args.readers)
+    await pool.open()
+    try:
+        elapsed, latencies = await run_workload(args, pool.reader, pool.writer)
+        report(f"after (DatabasePool, WAL, {args.readers} readers)", elapsed, latencies, args.operations)
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--operations", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--write-percent", type=int, default=10)
+    args = parser.parse_args()
+    logging.getLogger("app.main").setLevel(logging.WARNING)
+    asyncio.run(main(args))
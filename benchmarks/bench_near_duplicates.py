@@ -0,0 +1,90 @@
+"""Near-duplicate matching: correctness on claim pairs and lookup time.
+
+Each entry in benchmarks/near_duplicate_corpus.jsonl stores one claim and
+looks up a variant of it, recording whether the variant should be answered
+with the stored claim (typos, punctuation) or not (negations, changed
+numbers, added or swapped words). The script exits non-zero if
+NearDuplicateIndex disagrees with any of them, then times lookups against an
+index of synthetic claims.
+
+    python benchmarks/bench_near_duplicates.py --claims 100000 --lookups 2000
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ROOT))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(prefix="factcheck-bench-"), "app.db"))
+
+from app.main import NEAR_DUPLICATE_THRESHOLD, NearDuplicateIndex, normalize_claim
+from seed_db import make_claim
+
+CORPUS = os.path.join(ROOT, "near_duplicate_corpus.jsonl")
+
+
+def typo(rng, claim):
+    # Drop one letter from the claim's longest word
+    words = claim.split()
+    longest = max(range(len(words)), key=lambda i: len(words[i]))
+    word = words[longest]
+    position = rng.randrange(1, len(word))
+    words[longest] = word[:position] + word[position + 1:]
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD)
+    parser.add_argument("--claims", type=int, default=10000, help="claims in the index for the timing run")
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--verbose", action="store_true", help="show the result for every corpus entry")
+    args = parser.parse_args()
+    logging.getLogger("app.main").setLevel(logging.WARNING)
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+
+    mismatches = []
+    for case in corpus:
+        index = NearDuplicateIndex(args.threshold)
+        stored = normalize_claim(case["stored"])
+        index.add(stored)
+        matched = index.find(normalize_claim(case["query"])) == stored
+        if args.verbose:
+            print(f"  {case['name']:<28} {'matched' if matched else 'no match'}")
+        if matched != case["match"]:
+            mismatches.append(case["name"])
+    print(f"corpus   {len(corpus) - len(mismatches)}/{len(corpus)} pairs as expected")
+
+    rng = random.Random(42)
+    claims = [normalize_claim(make_claim(rng, i)[0]) for i in range(args.claims)]
+    index = NearDuplicateIndex(args.threshold)
+    started = time.perf_counter()
+    for claim in claims:
+        index.add(claim)
+    build = time.perf_counter() - started
+    queries = [typo(rng, claim) for claim in rng.choices(claims, k=args.lookups)]
+    started = time.perf_counter()
+    hits = sum(index.find(query) is not None for query in queries)
+    per_lookup = (time.perf_counter() - started) / args.lookups
+    print(
+        f"index    {args.claims} claims built in {build:.1f}s, "
+        f"{per_lookup * 1e6:.0f} us per lookup, {hits}/{args.lookups} typo lookups matched"
+    )
+
+    if mismatches:
+        print(f"Unexpected results: {', '.join(mismatches)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
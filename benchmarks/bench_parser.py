@@ -0,0 +1,91 @@
+"""Parse success rate and parse time of model replies, old parser vs. new.
+
+Runs every reply in benchmarks/parser_corpus.jsonl through the previous
+strip-and-literal_eval parser and through app.main.parse_ai_content. Each
+corpus entry records whether it should be parseable; the script exits
+non-zero if the current parser disagrees with any of them.
+
+    python benchmarks/bench_parser.py --iterations 2000
+"""
+import argparse
+import ast
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(prefix="factcheck-bench-"), "app.db"))
+
+from app.main import parse_ai_content
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parser_corpus.jsonl")
+
+
+def legacy_parse(content):
+    # parse_ai_content before the tolerant parser, kept for comparison
+    if content.startswith('\\boxed{'):
+        content = content[6:].strip()
+
+    content = content.replace('\n', '').replace('    ', '')
+    parsed = ast.literal_eval(content)
+    if not all(key in parsed for key in ['answer', 'sources', 'classification']):
+        raise ValueError("Missing required fields in response")
+    return parsed
+
+
+def try_parse(parser, content):
+    try:
+        return parser(content)
+    except Exception:
+        return None
+
+
+def measure(parser, corpus, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for case in corpus:
+            try_parse(parser, case["content"])
+    return (time.perf_counter() - started) / (iterations * len(corpus))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--verbose", action="store_true", help="show the result for every corpus entry")
+    args = parser.parse_args()
+    logging.getLogger("app.main").setLevel(logging.WARNING)
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    parseable = sum(case["parseable"] for case in corpus)
+
+    mismatches = []
+    for label, candidate in (("legacy", legacy_parse), ("current", parse_ai_content)):
+        successes = 0
+        for case in corpus:
+            result = try_parse(candidate, case["content"])
+            ok = isinstance(result, dict) and bool(result.get("answer")) and bool(result.get("classification"))
+            successes += ok and case["parseable"]
+            if args.verbose:
+                print(f"  {label:<8} {case['name']:<28} {'ok' if ok else 'failed'}")
+            if label == "current" and ok != case["parseable"]:
+                mismatches.append(case["name"])
+        per_call = measure(candidate, corpus, args.iterations)
+        print(
+            f"{label:<8} parsed {successes}/{parseable} parseable replies "
+            f"({successes / parseable:.0%}), {per_call * 1e6:.1f} us per reply"
+        )
+
+    if mismatches:
+        print(f"Unexpected results: {', '.join(mismatches)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
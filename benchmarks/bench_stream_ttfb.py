@@ -0,0 +1,90 @@
+"""Compare time-to-first-byte of /factcheck and /factcheck/stream.
+
+Runs the app against a local OpenRouter stand-in that streams its reply over
+--latency seconds, then measures for each endpoint the time to the first
+response byte, to the first piece of answer text and to the complete result.
+
+    python benchmarks/bench_stream_ttfb.py --latency 20 --first-token-latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_concurrency import start_app
+from fake_openrouter import start_fake_openrouter
+
+
+async def measure_blocking(client, text):
+    start = time.perf_counter()
+    async with client.stream("POST", "/factcheck", json={"text": text}) as response:
+        first_byte = None
+        async for _ in response.aiter_bytes():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+    total = time.perf_counter() - start
+    # The blocking endpoint delivers the answer with the first byte of its body
+    return first_byte, first_byte, total
+
+
+async def measure_streaming(client, text):
+    start = time.perf_counter()
+    first_byte = first_answer = None
+    event = None
+    async with client.stream("POST", "/factcheck/stream", json={"text": text}) as response:
+        async for line in response.aiter_lines():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: ") and event == "answer" and first_answer is None:
+                if json.loads(line[6:])["text"]:
+                    first_answer = time.perf_counter() - start
+    return first_byte, first_answer, time.perf_counter() - start
+
+
+async def run(args):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=300) as client:
+        rows = [
+            ("POST /factcheck (miss)", await measure_blocking(client, "blocking cold claim")),
+            ("POST /factcheck/stream (miss)", await measure_streaming(client, "streaming cold claim")),
+            ("POST /factcheck/stream (hit)", await measure_streaming(client, "streaming cold claim")),
+        ]
+
+    print(f"Upstream generation {args.latency:.1f}s, first token after {args.first_token_latency:.1f}s")
+    print(f"  {'endpoint':<32}{'first byte':>12}{'first answer':>14}{'complete':>10}")
+    for label, (first_byte, first_answer, total) in rows:
+        print(f"  {label:<32}{first_byte:>11.3f}s{first_answer:>13.3f}s{total:>9.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=10.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    stub = start_fake_openrouter(latency=args.latency, first_token_latency=args.first_token_latency)
+    workdir = tempfile.mkdtemp(prefix="factcheck-bench-")
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "factcheck.db")
+    os.environ["OPENROUTER_URL"] = stub.url
+    os.environ["OPENROUTER_API_KEY"] = "benchmark"
+
+    start_app(args.port)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("app.main").setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
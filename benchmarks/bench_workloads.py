@@ -0,0 +1,336 @@
+"""Scripted load tests: req/s and latency percentiles per endpoint.
+
+Seeds (or copies) a cache database, starts the app under uvicorn in a
+subprocess against a local OpenRouter stand-in, and runs these workloads in
+turn:
+
+  viral    bursts of identical and near-identical /factcheck requests for a
+           new claim, followed by a burst of /claim/{id} reads of the result
+  claims   random /claim/{id} reads across the seeded rows
+  history  /api/history browsing with cursors, full-text search and
+           classification filters
+  sitemap  crawler fetching the sitemap index and every shard, then
+           revalidating them with If-None-Match
+  cold     unique claims that all miss the cache and go upstream
+
+Use --json to save the results and --baseline to compare against a saved run;
+the script exits non-zero when an endpoint's p95 or throughput regresses by
+more than --tolerance.
+
+    python benchmarks/bench_workloads.py --rows 100000 --duration 10
+    python benchmarks/bench_workloads.py --workloads history,sitemap --json after.json --baseline before.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_concurrency import percentile
+from fake_openrouter import start_fake_openrouter
+from seed_db import OBJECTS, SUBJECTS, seed_database
+
+SEARCH_TERMS = ["science", "women", "Quran", "hadith", "charity", "democracy", "music", "sword", "القرآن"]
+CLASSIFICATIONS = ["Accurate", "Misleading", "False", "Debated"]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, endpoint, seconds, ok):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        self.errors.setdefault(endpoint, 0)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def summary(self, elapsed):
+        results = {}
+        for endpoint, values in self.latencies.items():
+            results[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors[endpoint],
+                "rps": len(values) / elapsed,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+            }
+        return results
+
+
+async def timed(client, recorder, endpoint, method, url, expected=(200,), **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except Exception:
+        recorder.record(endpoint, time.perf_counter() - start, False)
+        return None
+    recorder.record(endpoint, time.perf_counter() - start, response.status_code in expected)
+    return response
+
+
+async def closed_loop(args, worker):
+    # Each of --concurrency workers issues requests back to back until the deadline
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(worker(random.Random(n), n, deadline) for n in range(args.concurrency)))
+
+
+async def run_viral(client, recorder, args, sample):
+    run_id = uuid.uuid4().hex[:6]
+    for burst in range(args.bursts):
+        claim = f"Viral claim {run_id} number {burst} about {random.choice(OBJECTS)}"
+        variants = [claim, claim.upper(), f"  {claim.lower()}!", claim.replace(" ", "  ")]
+        responses = await asyncio.gather(*(
+            timed(client, recorder, "POST /factcheck (viral)", "POST", "/factcheck",
+                  json={"text": variants[i % len(variants)]})
+            for i in range(args.burst_size)
+        ))
+        ids = [r.json()["id"] for r in responses if r is not None and r.status_code == 200]
+        if ids:
+            await asyncio.gather(*(
+                timed(client, recorder, "GET /claim/{id} (viral)", "GET", f"/claim/{ids[0]}")
+                for _ in range(args.burst_size)
+            ))
+
+
+async def run_claims(client, recorder, args, sample):
+    async def worker(rng, n, deadline):
+        while time.perf_counter() < deadline:
+            await timed(client, recorder, "GET /claim/{id}", "GET", f"/claim/{rng.choice(sample['ids'])}")
+
+    await closed_loop(args, worker)
+
+
+async def run_history(client, recorder, args, sample):
+    async def worker(rng, n, deadline):
+        cursor = None
+        while time.perf_counter() < deadline:
+            roll = rng.random()
+            if roll < 0.5:
+                # Browse a few pages deep, then start again from the newest claims
+                params = {"per_page": 10}
+                if cursor:
+                    params["after"] = cursor
+                response = await timed(client, recorder, "GET /api/history (browse)", "GET", "/api/history", params=params)
+                next_cursor = response.json()["pagination"].get("next_cursor") if response is not None and response.status_code == 200 else None
+                cursor = next_cursor if next_cursor and rng.random() < 0.8 else None
+            elif roll < 0.8:
+                params = {"search": rng.choice(SEARCH_TERMS), "page": rng.randint(1, 3)}
+                await timed(client, recorder, "GET /api/history (search)", "GET", "/api/history", params=params)
+            else:
+                params = {"classification": rng.choice(CLASSIFICATIONS)}
+                await timed(client, recorder, "GET /api/history (classification)", "GET", "/api/history", params=params)
+
+    await closed_loop(args, worker)
+
+
+async def run_sitemap(client, recorder, args, sample):
+    etags = {}
+
+    async def fetch(rng, path, endpoint):
+        headers = {"Accept-Encoding": "gzip"}
+        revalidate = path in etags and rng.random() < 0.5
+        if revalidate:
+            headers["If-None-Match"] = etags[path]
+            endpoint += " (revalidate)"
+        response = await timed(client, recorder, endpoint, "GET", path, expected=(200, 304), headers=headers)
+        if response is not None and response.status_code == 200:
+            etags[path] = response.headers.get("etag")
+        return response
+
+    async def worker(rng, n, deadline):
+        while time.perf_counter() < deadline:
+            response = await fetch(rng, "/sitemap.xml", "GET /sitemap.xml")
+            if response is None or response.status_code != 200:
+                continue
+            for loc in re.findall(r"<loc>[^<]*?(/sitemap-[^<]+)</loc>", response.text):
+                await fetch(rng, loc, "GET /sitemap-{shard}.xml")
+                if time.perf_counter() >= deadline:
+                    break
+
+    await closed_loop(args, worker)
+
+
+async def run_cold(client, recorder, args, sample):
+    run_id = uuid.uuid4().hex[:6]
+
+    async def worker(rng, n, deadline):
+        i = 0
+        while time.perf_counter() < deadline:
+            claim = f"Cold claim {run_id}-{n}-{i}: {rng.choice(SUBJECTS)} and {rng.choice(OBJECTS)}"
+            await timed(client, recorder, "POST /factcheck (cold)", "POST", "/factcheck", json={"text": claim})
+            i += 1
+
+    await closed_loop(args, worker)
+
+
+WORKLOADS = {
+    "viral": run_viral,
+    "claims": run_claims,
+    "history": run_history,
+    "sitemap": run_sitemap,
+    "cold": run_cold,
+}
+
+
+def load_sample(path, size=10000):
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        ids = [row[0] for row in db.execute("SELECT id FROM cache ORDER BY RANDOM() LIMIT ?", (size,))]
+    finally:
+        db.close()
+    return {"ids": ids}
+
+
+def start_server(args, db_path, openrouter_url):
+    env = dict(
+        os.environ,
+        DATABASE_PATH=db_path,
+        OPENROUTER_URL=openrouter_url,
+        OPENROUTER_API_KEY="benchmark",
+        OPENROUTER_MAX_CONNECTIONS=str(max(args.burst_size, args.concurrency)),
+    )
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+            "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+    return process
+
+
+async def wait_until_ready(client, process, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("App exited during startup")
+        try:
+            if (await client.get("/robots.txt")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("App did not start in time")
+
+
+async def run(args, sample, process):
+    import httpx
+
+    limits = httpx.Limits(max_connections=max(args.burst_size, args.concurrency))
+    results = {}
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=300, limits=limits) as client:
+        await wait_until_ready(client, process)
+        for name in args.workloads:
+            recorder = Recorder()
+            print(f"Running {name}...", flush=True)
+            started = time.perf_counter()
+            await WORKLOADS[name](client, recorder, args, sample)
+            results[name] = recorder.summary(time.perf_counter() - started)
+    return results
+
+
+def report(results):
+    print(f"\n{'endpoint':<46}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, endpoints in results.items():
+        print(f"[{name}]")
+        for endpoint, stats in endpoints.items():
+            print(
+                f"  {endpoint:<44}{stats['requests']:>9}{stats['errors']:>8}{stats['rps']:>9.1f}"
+                f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+            )
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, endpoints in results.items():
+        for endpoint, stats in endpoints.items():
+            before = baseline.get(name, {}).get(endpoint)
+            if not before:
+                continue
+            if stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name} {endpoint}: p95 {before['p95_ms']:.1f} -> {stats['p95_ms']:.1f} ms")
+            if stats["rps"] < before["rps"] * (1 - tolerance):
+                regressions.append(f"{name} {endpoint}: {before['rps']:.1f} -> {stats['rps']:.1f} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help="comma-separated subset to run")
+    parser.add_argument("--db", help="existing database to copy instead of seeding a new one")
+    parser.add_argument("--rows", type=int, default=10000, help="rows to seed when --db is not given")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per closed-loop workload")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients per closed-loop workload")
+    parser.add_argument("--bursts", type=int, default=5, help="viral bursts")
+    parser.add_argument("--burst-size", type=int, default=200, help="requests per viral burst")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=1.0, help="fake OpenRouter seconds per completion")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+    args.workloads = [name.strip() for name in args.workloads.split(",") if name.strip()]
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="factcheck-bench-")
+    db_path = os.path.join(workdir, "factcheck.db")
+    if args.db:
+        shutil.copy(args.db, db_path)
+    else:
+        print(f"Seeding {args.rows} rows")
+        seed_database(db_path, args.rows)
+    sample = load_sample(db_path)
+
+    stub = start_fake_openrouter(
+        latency=args.latency, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate, seed=42
+    )
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    process = start_server(args, db_path, stub.url)
+    try:
+        results = asyncio.run(run(args, sample, process))
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report(results)
+    print(f"\nFake OpenRouter: {stub.request_count} calls {stub.outcomes}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
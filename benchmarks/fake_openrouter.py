@@ -0,0 +1,176 @@
+"""Local stand-in for the OpenRouter chat completions API.
+
+Run standalone with ``python benchmarks/fake_openrouter.py --port 9100`` and
+point the app at it with ``OPENROUTER_URL=http://127.0.0.1:9100/api/v1/chat/completions``.
+
+Failures can be injected at a given rate: ``--error-rate`` answers 500,
+``--rate-limit-rate`` answers 429 with ``Retry-After``, and ``--malformed-rate``
+returns one of the malformed replies seen from the model in production
+(``\\boxed{`` wrappers, code fences, surrounding prose, truncated JSON).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_CONTENT = {
+    "answer": "This is a canned analysis produced by the local OpenRouter stand-in.",
+    "sources": ["Quran 2:256", "Sahih al-Bukhari 1", "Benchmark Source"],
+    "classification": "Misleading",
+}
+
+MALFORMED_CONTENT = [
+    # The wrapper the app strips today
+    "\\boxed{" + json.dumps(DEFAULT_CONTENT) + "}",
+    # Wrapper with newlines and indentation inside the answer
+    "\\boxed{\n" + json.dumps(DEFAULT_CONTENT, indent=4) + "\n}",
+    "```json\n" + json.dumps(DEFAULT_CONTENT, indent=2) + "\n```",
+    "Here is my analysis:\n" + json.dumps(DEFAULT_CONTENT) + "\nI hope this helps.",
+    # JSON literals that Python's literal_eval rejects
+    json.dumps({**DEFAULT_CONTENT, "translated": False, "notes": None}),
+    # Cut off mid-answer, as when the model hits its token limit
+    "\\boxed{" + json.dumps(DEFAULT_CONTENT)[:60],
+]
+
+
+class FakeOpenRouterHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        outcome = self.server.choose_outcome()
+
+        if outcome == "rate_limited":
+            self.send_json(429, {"error": {"message": "Rate limit exceeded"}}, {"Retry-After": "1"})
+            return
+        if outcome == "error":
+            time.sleep(self.server.latency / 10)
+            self.send_json(500, {"error": {"message": "Internal server error"}})
+            return
+
+        content = json.dumps(DEFAULT_CONTENT)
+        if outcome == "malformed":
+            content = self.server.choose_malformed()
+
+        if payload.get("stream"):
+            self.stream_completion(content)
+            return
+
+        time.sleep(self.server.latency)
+        self.send_json(200, {"choices": [{"message": {"content": content}}]})
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def stream_completion(self, content, chunk_size=8):
+        # Mimic OpenRouter's SSE stream: the first token after first_token_latency,
+        # the rest spread evenly over the remaining latency
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.write_chunk(": OPENROUTER PROCESSING\n\n")
+
+        time.sleep(min(self.server.first_token_latency, self.server.latency))
+        pieces = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+        delay = max(0.0, self.server.latency - self.server.first_token_latency) / max(len(pieces), 1)
+        for piece in pieces:
+            chunk = {"choices": [{"delta": {"content": piece}}]}
+            self.write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            time.sleep(delay)
+        self.write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class FakeOpenRouterServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self, address, latency=0.0, first_token_latency=0.2,
+        error_rate=0.0, rate_limit_rate=0.0, malformed_rate=0.0, seed=None
+    ):
+        super().__init__(address, FakeOpenRouterHandler)
+        self.latency = latency
+        self.first_token_latency = first_token_latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.outcomes = {"ok": 0, "error": 0, "rate_limited": 0, "malformed": 0}
+
+    def choose_outcome(self):
+        with self.lock:
+            self.request_count += 1
+            roll = self.random.random()
+            if roll < self.rate_limit_rate:
+                outcome = "rate_limited"
+            elif roll < self.rate_limit_rate + self.error_rate:
+                outcome = "error"
+            elif roll < self.rate_limit_rate + self.error_rate + self.malformed_rate:
+                outcome = "malformed"
+            else:
+                outcome = "ok"
+            self.outcomes[outcome] += 1
+            return outcome
+
+    def choose_malformed(self):
+        with self.lock:
+            return self.random.choice(MALFORMED_CONTENT)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+
+def start_fake_openrouter(port=0, latency=0.0, first_token_latency=0.2, **failures):
+    """Start the stand-in on a background thread and return the server.
+
+    ``failures`` accepts error_rate, rate_limit_rate, malformed_rate and seed.
+    """
+    server = FakeOpenRouterServer(
+        ("127.0.0.1", port), latency=latency, first_token_latency=first_token_latency, **failures
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=2.0, help="seconds per completion")
+    parser.add_argument("--first-token-latency", type=float, default=0.2, help="seconds before the first streamed token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of replies that are malformed")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakeOpenRouterServer(
+        ("127.0.0.1", args.port), latency=args.latency, first_token_latency=args.first_token_latency,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate, seed=args.seed
+    )
+    print(f"Fake OpenRouter listening on {server.url}")
+    server.serve_forever()
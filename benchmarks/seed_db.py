@@ -0,0 +1,140 @@
+"""Generate a cache database of synthetic fact-checks for benchmarking.
+
+The schema is created by the app itself (init_db runs every migration), and
+rows are inserted through a connection with the app's fts_fold function
+registered so the search index triggers fire as they would in production.
+The same --seed always produces the same rows.
+
+    python benchmarks/seed_db.py --rows 100000 --output /tmp/factcheck-100k.db
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SUBJECTS = [
+    "Islam", "the Quran", "the Prophet", "hadith", "sharia", "jihad", "hijab", "Ramadan",
+    "zakat", "the caliphate", "Muslim women", "apostasy", "the Hajj", "Sufism", "fatwas",
+]
+PREDICATES = [
+    "forbids", "requires", "was spread by", "teaches", "rejects", "encourages",
+    "has nothing to say about", "was invented to justify", "is incompatible with", "permits",
+]
+OBJECTS = [
+    "science", "democracy", "women's education", "music", "the sword", "charity", "slavery",
+    "interfaith marriage", "free speech", "violence", "forgiveness", "art", "banking interest",
+]
+ARABIC_CLAIMS = [
+    "الإسلام يحرم تعليم المرأة",
+    "القرآن يأمر بقتل غير المسلمين",
+    "الحجاب فرض في القرآن",
+    "النبي منع الموسيقى",
+]
+CLASSIFICATIONS = ["Accurate", "Misleading", "False", "Debated"]
+CLASSIFICATION_WEIGHTS = [15, 40, 30, 15]
+SOURCES = [
+    "Quran 2:256", "Quran 5:32", "Quran 4:34", "Sahih al-Bukhari 1", "Sahih Muslim 2564",
+    "Ibn Kathir, Tafsir", "al-Ghazali, Ihya", "Bernard Lewis, The Crisis of Islam",
+    "Karen Armstrong, Islam: A Short History", "Wael Hallaq, Sharia",
+]
+
+
+def make_claim(rng, i):
+    if rng.random() < 0.1:
+        text = f"{rng.choice(ARABIC_CLAIMS)} {i}"
+        language = "ar"
+    else:
+        text = f"{rng.choice(SUBJECTS)} {rng.choice(PREDICATES)} {rng.choice(OBJECTS)} ({i})"
+        language = "en"
+    classification = rng.choices(CLASSIFICATIONS, CLASSIFICATION_WEIGHTS)[0]
+    sentences = [
+        f"The claim that {text.lower()} needs context.",
+        f"Classical scholars discussed {rng.choice(OBJECTS)} at length.",
+        f"Western academics disagree about {rng.choice(SUBJECTS)}.",
+    ]
+    answer = " ".join(rng.choice(sentences) for _ in range(rng.randint(4, 20)))
+    response = {
+        "answer": answer,
+        "sources": rng.sample(SOURCES, rng.randint(2, 5)),
+        "classification": classification,
+    }
+    return text, language, classification, response
+
+
+def seed_rows(path, rows, seed, days, batch_size=10000):
+    from app.main import fold_search_text, get_claim_key, normalize_claim
+
+    rng = random.Random(seed)
+    now = time.time()
+    db = sqlite3.connect(path)
+    db.create_function("fts_fold", 1, fold_search_text, deterministic=True)
+    db.execute("PRAGMA synchronous = OFF")
+    started = time.perf_counter()
+    try:
+        for start in range(0, rows, batch_size):
+            batch = []
+            for i in range(start, min(rows, start + batch_size)):
+                text, language, classification, response = make_claim(rng, i)
+                normalized = normalize_claim(text)
+                # Oldest first, so rowids follow insertion order as they do in production
+                timestamp = now - days * 86400 * (rows - i) / rows
+                body = json.dumps(response)
+                batch.append((
+                    get_claim_key(normalized)[:8], text, normalized, body, timestamp,
+                    classification, language, len(response["answer"]), timestamp, timestamp
+                ))
+            db.executemany(
+                """
+                INSERT OR IGNORE INTO cache (
+                    id, query, normalized_query, response, timestamp,
+                    classification, language, answer_length, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                batch
+            )
+            db.commit()
+            print(f"  {min(rows, start + batch_size)} / {rows} rows", end="\r", flush=True)
+        db.execute("PRAGMA optimize")
+        db.commit()
+        # The odd id collision between generated claims is skipped, as the app would rehash it
+        inserted = db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+    finally:
+        db.close()
+    print(f"  {inserted} rows in {time.perf_counter() - started:.1f}s")
+
+
+def seed_database(path, rows, seed=42, days=30):
+    """Create the app schema at ``path`` and fill it with ``rows`` synthetic claims."""
+    os.environ["DATABASE_PATH"] = path
+    from app import main as app_main
+
+    app_main.DB_PATH = path
+    logging.getLogger("app.main").setLevel(logging.WARNING)
+    asyncio.run(app_main.init_db())
+    seed_rows(path, rows, seed, days)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--output", required=True, help="database file to create")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=float, default=30, help="spread timestamps over this many days")
+    args = parser.parse_args()
+
+    if os.path.exists(args.output):
+        parser.error(f"{args.output} already exists")
+    print(f"Seeding {args.output}")
+    seed_database(args.output, args.rows, args.seed, args.days)
+
+
+if __name__ == "__main__":
+    main()